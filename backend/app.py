@@ -4,6 +4,8 @@ from flask_jwt_extended import JWTManager
 from models import db
 import os
 from models.blacklist import blacklist
+from services.interaction_logger import interaction_logger
+from models.session import create_history_indexes
 from dotenv import load_dotenv
 from config import DevelopmentConfig, ProductionConfig
 import logging
@@ -33,6 +35,7 @@ def create_app(config_class=DevelopmentConfig):
     # Initialize extensions
     db.init_app(flask_app)
     jwt = JWTManager(flask_app)
+    interaction_logger.init_app(flask_app)
 
     @jwt.token_in_blocklist_loader
     def check_if_token_revoked(_, jwt_payload):
@@ -70,7 +73,9 @@ def log_request_info():
 if __name__ == '__main__':
     with app.app_context():
         # Ensure the database directory exists
-        db_dir = os.path.dirname(app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', ''))
-        os.makedirs(db_dir, exist_ok=True)
+        if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite:///'):
+            db_dir = os.path.dirname(app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', ''))
+            os.makedirs(db_dir, exist_ok=True)
         db.create_all()
+        create_history_indexes()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -1,4 +1,29 @@
 import os
+from dotenv import load_dotenv
+
+# The settings below are read from the environment when this module is imported
+load_dotenv()
+
+def database_engine_options(uri):
+    """
+    SQLAlchemy engine options for a database URL. SQLite waits for locks instead of failing
+    at once (its pragmas are set per connection in models); client-server databases get a
+    sized connection pool whose connections are checked before use.
+    """
+    if uri.startswith('sqlite'):
+        return {
+            'connect_args': {
+                'timeout': float(os.environ.get('SQLITE_BUSY_TIMEOUT', 5.0)),
+                'check_same_thread': False
+            }
+        }
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True
+    }
 
 class Config:
     # Common configurations
@@ -13,9 +38,13 @@ class Config:
     if not os.path.exists(INSTANCE_DIR):
         os.makedirs(INSTANCE_DIR, mode=0o777, exist_ok=True)
     
-    # Database configuration - use absolute path
+    # Database configuration - use absolute path, or a client-server database from DATABASE_URL
     DB_FILE = os.path.join(INSTANCE_DIR, 'bloom_dev.db')
-    SQLALCHEMY_DATABASE_URI = f'sqlite:///{DB_FILE}'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or f'sqlite:///{DB_FILE}'
+    if SQLALCHEMY_DATABASE_URI.startswith('postgres://'):
+        # SQLAlchemy only accepts the postgresql:// scheme
+        SQLALCHEMY_DATABASE_URI = 'postgresql://' + SQLALCHEMY_DATABASE_URI[len('postgres://'):]
+    SQLALCHEMY_ENGINE_OPTIONS = database_engine_options(SQLALCHEMY_DATABASE_URI)
     
     # API Keys
     GROQ_API_KEY = os.environ.get('GROQ_API_KEY')
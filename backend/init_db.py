@@ -1,7 +1,9 @@
 from flask import Flask
 from models import db
 from models.user import User, Role
+from models.session import create_history_indexes
 from werkzeug.security import generate_password_hash
+from config import Config
 import os
 from dotenv import load_dotenv
 
@@ -10,8 +12,9 @@ load_dotenv()
 def init_database():
     app = Flask(__name__)
     
-    # Configure SQLite database
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///bloom_dev.db'
+    # Use the same database, and engine settings, as the application
+    app.config['SQLALCHEMY_DATABASE_URI'] = Config.SQLALCHEMY_DATABASE_URI
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = Config.SQLALCHEMY_ENGINE_OPTIONS
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
     # Initialize database
@@ -19,8 +22,9 @@ def init_database():
     
     with app.app_context():
         try:
-            # Create all tables
+            # Create all tables, and indexes added since existing tables were created
             db.create_all()
+            create_history_indexes()
             
             # Create roles
             roles = [
@@ -1,4 +1,28 @@
 #initializes the Flask-SQLAlchemy extension
+import os
+import sqlite3
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy()
+
+@event.listens_for(Engine, 'connect')
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    """
+    Tune every new SQLite connection: WAL lets readers and the writer work at the same
+    time, synchronous=NORMAL is durable under WAL with far fewer fsyncs, and the busy
+    timeout makes writers queue for the lock instead of failing with "database is locked"
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    busy_timeout_ms = int(float(os.environ.get('SQLITE_BUSY_TIMEOUT', 5.0)) * 1000)
+    cache_kib = int(os.environ.get('SQLITE_CACHE_KB', 16384))
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f'PRAGMA busy_timeout={busy_timeout_ms}')
+    # Negative sizes are in KiB rather than pages
+    cursor.execute(f'PRAGMA cache_size=-{cache_kib}')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.close()
@@ -1 +1,208 @@
-blacklist = set()
\ No newline at end of file
+import os
+import math
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from config import Config
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings. Membership tests never miss an added item and
+    wrongly report about false_positive_rate of other items while at most capacity were added.
+    Positions come from Python's string hash, which is salted per process; the filter is
+    never shared between processes.
+    """
+
+    def __init__(self, capacity: int, false_positive_rate: float = 0.001):
+        self.capacity = max(capacity, 1)
+        self.size = max(8, int(-self.capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        # Double hashing: two 32-bit halves of one 64-bit hash give every position
+        hashed = hash(item) & 0xFFFFFFFFFFFFFFFF
+        first, step = hashed & 0xFFFFFFFF, (hashed >> 32) | 1
+        return [(first + i * step) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        # Same positions as _positions, computed inline and stopping at the first clear bit,
+        # usually the first or second for items never added
+        hashed = hash(item) & 0xFFFFFFFFFFFFFFFF
+        position, step = hashed & 0xFFFFFFFF, (hashed >> 32) | 1
+        size, bits = self.size, self._bits
+        for _ in range(self.hash_count):
+            position %= size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+            position += step
+        return True
+
+class TokenBlacklist:
+    """
+    Revoked JWT ids, stored in SQLite with the expiry of their token so every worker sees
+    the same revocations and expired entries are purged instead of kept forever.
+    Lookups go through an in-process Bloom filter first, so the check made on every
+    authenticated request is a few bit tests for tokens that were never revoked; possible
+    hits are confirmed from a small LRU cache, then the database. Revocations made by other
+    processes are picked up within sync_interval seconds.
+    The store also records when each user's roles or password last changed, so role claims
+    in tokens issued before the change stop being trusted in every worker, and after restarts.
+    """
+
+    def __init__(self, path: str = None, capacity: int = None, sync_interval: float = None,
+                 purge_interval: float = None, cache_size: int = 1024):
+        self.path = path or os.environ.get('JWT_REVOCATION_DB', os.path.join(Config.INSTANCE_DIR, 'revoked_tokens.db'))
+        self.capacity = capacity or int(os.environ.get('JWT_REVOCATION_CAPACITY', 100000))
+        self.sync_interval = sync_interval if sync_interval is not None else float(os.environ.get('JWT_REVOCATION_SYNC_INTERVAL', 1.0))
+        self.purge_interval = purge_interval if purge_interval is not None else float(os.environ.get('JWT_REVOCATION_PURGE_INTERVAL', 3600))
+        self.cache_size = cache_size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._recent = OrderedDict()  # jti -> revoked, least recently used first
+        self._bloom = None
+        self._last_id = 0
+        self._user_changes = {}  # user id -> time of the last role or password change
+        self._last_change_id = 0
+        self._next_sync = 0.0
+        self._next_purge = 0.0
+
+        with self._connection() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS revoked_tokens ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, jti TEXT NOT NULL UNIQUE, expires_at REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_revoked_tokens_expires_at ON revoked_tokens (expires_at)')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS user_changes ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL UNIQUE, changed_at REAL NOT NULL)'
+            )
+        self._rebuild()
+
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection; sqlite3 connections cannot be shared between threads"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            # Readers in other workers do not block the writer, and vice versa
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def _rebuild(self) -> None:
+        """Drop expired entries and rebuild the filter from the rest, since Bloom filters cannot delete"""
+        connection = self._connection()
+        now = time.time()
+        with connection:
+            connection.execute('DELETE FROM revoked_tokens WHERE expires_at < ?', (now,))
+            # Every token issued before an older change has expired
+            connection.execute('DELETE FROM user_changes WHERE changed_at < ?', (now - Config.JWT_ACCESS_TOKEN_EXPIRES,))
+        rows = connection.execute('SELECT id, jti FROM revoked_tokens').fetchall()
+        changes = connection.execute('SELECT id, user_id, changed_at FROM user_changes').fetchall()
+
+        bloom = BloomFilter(max(self.capacity, 2 * len(rows)))
+        for _, jti in rows:
+            bloom.add(jti)
+        with self._lock:
+            self._bloom = bloom
+            self._last_id = max((row_id for row_id, _ in rows), default=self._last_id)
+            self._user_changes = {user_id: changed_at for _, user_id, changed_at in changes}
+            self._last_change_id = max((row_id for row_id, _, _ in changes), default=self._last_change_id)
+            self._recent.clear()
+            self._next_sync = time.monotonic() + self.sync_interval
+            self._next_purge = time.monotonic() + self.purge_interval
+
+    def _sync(self) -> None:
+        """Add revocations and user changes other processes made since the last sync"""
+        if time.monotonic() >= self._next_purge:
+            self._rebuild()
+            return
+        connection = self._connection()
+        rows = connection.execute(
+            'SELECT id, jti FROM revoked_tokens WHERE id > ? ORDER BY id', (self._last_id,)
+        ).fetchall()
+        # Recording a change replaces the user's row, giving it a new id
+        changes = connection.execute(
+            'SELECT id, user_id, changed_at FROM user_changes WHERE id > ? ORDER BY id', (self._last_change_id,)
+        ).fetchall()
+        with self._lock:
+            for row_id, jti in rows:
+                self._bloom.add(jti)
+                self._recent.pop(jti, None)
+                self._last_id = max(self._last_id, row_id)
+            for row_id, user_id, changed_at in changes:
+                self._user_changes[user_id] = max(changed_at, self._user_changes.get(user_id, 0.0))
+                self._last_change_id = max(self._last_change_id, row_id)
+            self._next_sync = time.monotonic() + self.sync_interval
+        if self._bloom.count > 2 * self._bloom.capacity:
+            # Far past capacity the filter stops filtering; resize it
+            self._rebuild()
+
+    def add(self, jti: str, expires_at: float = None) -> None:
+        """Revoke a token until expires_at (a Unix time), by default until the access token lifetime passes"""
+        if expires_at is None:
+            expires_at = time.time() + Config.JWT_ACCESS_TOKEN_EXPIRES
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO revoked_tokens (jti, expires_at) VALUES (?, ?)', (jti, expires_at)
+            )
+        with self._lock:
+            self._bloom.add(jti)
+            self._recent[jti] = True
+            self._recent.move_to_end(jti)
+            while len(self._recent) > self.cache_size:
+                self._recent.popitem(last=False)
+
+    def __contains__(self, jti: str) -> bool:
+        if time.monotonic() >= self._next_sync:
+            self._sync()
+        if jti not in self._bloom:
+            return False
+
+        with self._lock:
+            revoked = self._recent.get(jti)
+            if revoked is not None:
+                self._recent.move_to_end(jti)
+                return revoked
+        revoked = self._connection().execute(
+            'SELECT 1 FROM revoked_tokens WHERE jti = ? AND expires_at >= ?', (jti, time.time())
+        ).fetchone() is not None
+        with self._lock:
+            self._recent[jti] = revoked
+            while len(self._recent) > self.cache_size:
+                self._recent.popitem(last=False)
+        return revoked
+
+    def mark_user_changed(self, user_id: int, changed_at: float = None) -> None:
+        """Record that a user's roles or password changed, so claims in their earlier tokens are not trusted"""
+        if changed_at is None:
+            changed_at = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO user_changes (user_id, changed_at) VALUES (?, ?)', (user_id, changed_at)
+            )
+        with self._lock:
+            self._user_changes[user_id] = max(changed_at, self._user_changes.get(user_id, 0.0))
+
+    def user_changed_since(self, user_id: int, timestamp: float) -> bool:
+        """Whether the user's roles or password changed at or after timestamp, in any process"""
+        if time.monotonic() >= self._next_sync:
+            self._sync()
+        with self._lock:
+            changed_at = self._user_changes.get(user_id)
+        return changed_at is not None and changed_at >= timestamp
+
+    def __len__(self) -> int:
+        return self._connection().execute('SELECT COUNT(*) FROM revoked_tokens').fetchone()[0]
+
+blacklist = TokenBlacklist()
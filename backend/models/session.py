@@ -3,6 +3,10 @@ from datetime import datetime
 
 class Session(db.Model):
     __tablename__ = 'sessions'
+    __table_args__ = (
+        # A student's sessions, newest first, for history pages
+        db.Index('ix_sessions_user_id_start_time', 'user_id', 'start_time'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -17,13 +21,23 @@ class Session(db.Model):
 
 class Interaction(db.Model):
     __tablename__ = 'interactions'
+    __table_args__ = (
+        # A session's interactions in time order, for history pages
+        db.Index('ix_interactions_session_id_timestamp', 'session_id', 'timestamp'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.Integer, db.ForeignKey('sessions.id'), nullable=False)
-    query_type = db.Column(db.String(20), nullable=False)  # 'text', 'image', 'voice'
+    query_type = db.Column(db.String(20), nullable=False)  # 'text', 'image', 'voice', 'file'
     query_content = db.Column(db.Text, nullable=False)
     response = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     
     def __repr__(self):
-        return f'<Interaction {self.id} - Session {self.session_id}>'
\ No newline at end of file
+        return f'<Interaction {self.id} - Session {self.session_id}>'
+
+def create_history_indexes():
+    """Add the history indexes to databases whose tables were created before the indexes existed"""
+    for table in (Session.__table__, Interaction.__table__):
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
@@ -4,6 +4,7 @@ from routes.ai_routes import ai_bp
 from routes.file_routes import file_bp
 from routes.screen_routes import screen_bp
 from routes.tutor_routes import tutor_bp
+from routes.history_routes import history_bp
 
 def register_routes(app: Flask):
     """Register all blueprint routes"""
@@ -11,4 +12,5 @@ def register_routes(app: Flask):
     app.register_blueprint(ai_bp, url_prefix='/api/ai')
     app.register_blueprint(file_bp, url_prefix='/api/file')
     app.register_blueprint(screen_bp, url_prefix='/api/screen')
-    app.register_blueprint(tutor_bp, url_prefix='/api/tutor')
\ No newline at end of file
+    app.register_blueprint(tutor_bp, url_prefix='/api/tutor')
+    app.register_blueprint(history_bp, url_prefix='/api/history')
\ No newline at end of file
@@ -1,8 +1,11 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from services.groq_service import GroqService
 from services.speech_service import SpeechService
+from services.file_service import file_service
+from services.interaction_logger import interaction_logger
 from flask_jwt_extended import jwt_required
 import os
+import json
 from werkzeug.utils import secure_filename
 from werkzeug.exceptions import BadRequest
 from requests.exceptions import RequestException
@@ -44,6 +47,7 @@ def analyze():
             if translated and 'choices' in translated:
                 response_text = translated['choices'][0]['message']['content']
 
+        interaction_logger.log('text', prompt, response_text, data.get('subject', 'general'))
         return jsonify({
             'response': response_text,
             'status': 'success'
@@ -61,13 +65,29 @@ def analyze_with_context():
     """Process an AI request with file context"""
     try:
         data = request.json
-        if not data or 'content' not in data:
+        if not data:
             return jsonify({'error': 'File content is required'}), 400
 
-        content = data['content']
         file_type = data.get('fileType', '')
         language = data.get('language', 'English')
 
+        if data.get('session_id') and data.get('file_id'):
+            # Reference a file already uploaded to the session instead of resending it
+            try:
+                content = file_service.get_file_text(data['session_id'], data['file_id'])
+                file_type = file_type or file_service.get_file_mime_type(data['session_id'], data['file_id'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 404
+            if not content:
+                return jsonify({'error': 'No readable text found in file'}), 400
+            # The file text can be megabytes; the interaction only needs to say which file
+            query = f"Analyze file {data['file_id']}"
+        elif 'content' in data:
+            content = data['content']
+            query = f"Analyze {file_type or 'file'} content ({len(content)} characters)"
+        else:
+            return jsonify({'error': 'File content or session_id and file_id are required'}), 400
+
         # Create prompt with context
         prompt = f"""
         Analyze the following content from a {file_type} file:
@@ -96,6 +116,7 @@ def analyze_with_context():
             translated = groq_service.translate_content(response_text, language)
             response_text = translated.get('choices', [{}])[0].get('message', {}).get('content', response_text)
 
+        interaction_logger.log('file', query, response_text, data.get('subject', 'general'))
         return jsonify({'response': response_text})
 
     except (RequestException, RuntimeError) as e:
@@ -114,13 +135,15 @@ def process_audio():
         language = request.form.get('language', 'en')
 
         # Transcribe audio
-        transcription = speech_service.transcribe_audio(audio_file, language)
+        result = speech_service.transcribe(audio_file.read(), language)
+        transcription = result['text']
         
         if not transcription:
             return jsonify({'error': 'Could not transcribe audio'}), 500
 
         return jsonify({
             'transcription': transcription,
+            'audio': result['audio'],  # Seconds and bytes saved by normalization
             'status': 'success'
         })
 
@@ -128,11 +151,102 @@ def process_audio():
         print(f"Error processing audio: {str(e)}")
         return jsonify({'error': str(e)}), 400 if isinstance(e, BadRequest) else 500
 
+@ai_bp.route('/process-audio/stream', methods=['POST'])
+@jwt_required()
+def start_audio_stream():
+    """Start a live transcription; audio chunks are then posted to it as they are recorded"""
+    try:
+        data = request.get_json(silent=True) or {}
+        stream = speech_service.start_stream(data.get('language', request.form.get('language', 'en')))
+        return jsonify({'stream_id': stream.id, 'status': 'success'})
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 503
+
+@ai_bp.route('/process-audio/stream/<stream_id>', methods=['POST'])
+@jwt_required()
+def send_audio_chunk(stream_id):
+    """Append recorded audio to a live transcription; final=1 marks the end of the recording"""
+    stream = speech_service.get_stream(stream_id)
+    if stream is None:
+        return jsonify({'error': 'Unknown transcription stream'}), 404
+
+    # Raw bytes in the body, or an 'audio' part for clients that only send forms
+    chunk = request.files['audio'].read() if 'audio' in request.files else request.get_data()
+    stream.feed(chunk)
+    if request.args.get('final') in ('1', 'true'):
+        stream.finish()
+    return jsonify({'status': 'success'})
+
+@ai_bp.route('/process-audio/stream/<stream_id>/events', methods=['GET'])
+@jwt_required()
+def audio_stream_events(stream_id):
+    """Server-Sent Events with partial transcripts as they are recognized, ending with the final text"""
+    stream = speech_service.get_stream(stream_id)
+    if stream is None:
+        return jsonify({'error': 'Unknown transcription stream'}), 404
+
+    def generate():
+        last_sequence = 0
+        while True:
+            events = stream.wait_for_events(last_sequence, timeout=15)
+            if not events:
+                yield ": keepalive\n\n"
+                continue
+            for event in events:
+                name = 'done' if event.get('done') else 'final' if event['is_final'] else 'partial'
+                yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+            last_sequence = events[-1]['sequence']
+            if events[-1].get('done'):
+                return
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@ai_bp.route('/text-to-speech', methods=['POST'])
+@jwt_required()
+def text_to_speech():
+    """Stream spoken MP3 audio for text, sentence by sentence, so playback starts early"""
+    data = request.get_json(silent=True) or {}
+    text = data.get('text', '')
+    if not text.strip():
+        return jsonify({'error': 'Text is required'}), 400
+
+    try:
+        audio = speech_service.synthesize_stream(text, data.get('language', 'en'), data.get('voice'))
+        # Synthesize the first sentence before responding so failures still get an error status
+        first = next(audio, b'')
+    except Exception as e:
+        print(f"Error synthesizing speech: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+    def generate():
+        yield first
+        yield from audio
+
+    return Response(generate(), mimetype='audio/mpeg', headers={'Cache-Control': 'no-cache'})
+
 @ai_bp.route('/analyze-image', methods=['POST'])
 def analyze_image():
     """Analyze an image using Groq's vision model"""
     try:
-        if 'image' in request.files:
+        if len(request.files.getlist('image')) > 1:
+            # Several pages (e.g. multi-page homework) share one vision request
+            images = request.files.getlist('image')
+            query = request.form.get('query', "What's in this image?")
+            labels = [secure_filename(image.filename) or f"Image {index}" for index, image in enumerate(images, 1)]
+            answers = groq_service.analyze_images([image.read() for image in images], query, labels)
+            interaction_logger.log('image', query, "\n\n".join(answers), request.form.get('subject', 'general'))
+            return jsonify({
+                'results': [
+                    {'filename': label, 'analysis': answer}
+                    for label, answer in zip(labels, answers)
+                ],
+                'status': 'success'
+            })
+
+        elif 'image' in request.files:
             # Handle file upload
             image = request.files['image']
             if not image.filename:
@@ -147,6 +261,7 @@ def analyze_image():
                 # Get the query from form data or use default
                 query = request.form.get('query', "What's in this image?")
                 result = groq_service.analyze_local_image(temp_path, query)
+                interaction_logger.log('image', query, result, request.form.get('subject', 'general'))
                 return jsonify(result)
             finally:
                 # Clean up temporary file
@@ -158,6 +273,7 @@ def analyze_image():
             image_url = request.json['image_url']
             query = request.json.get('query', "What's in this image?")
             result = groq_service.analyze_image(image_url, query, is_url=True)
+            interaction_logger.log('image', query, result, request.json.get('subject', 'general'))
             return jsonify(result)
             
         else:
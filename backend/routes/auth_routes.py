@@ -1,9 +1,10 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
 from models import db
 from models.user import User
 from models.blacklist import blacklist
+from utils.auth_utils import user_identity
+from services.password_service import password_hasher, PasswordHasherBusy
 from datetime import timedelta, datetime
 
 auth_bp = Blueprint('auth', __name__)
@@ -27,7 +28,7 @@ def register():
     
     # Create new user
     try:
-        hashed_password = generate_password_hash(data['password'], method='pbkdf2:sha256')
+        hashed_password = password_hasher.hash(data['password'])
         new_user = User(
             username=data['username'],
             email=data['email'],
@@ -42,6 +43,9 @@ def register():
             'username': new_user.username
         }), 201
         
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -60,16 +64,25 @@ def login():
         user = User.query.filter_by(email=data['email']).first()
         
         # Check if user exists and password is correct
-        if not user or not check_password_hash(user.password_hash, data['password']):
+        if not user:
+            return jsonify({'error': 'Invalid credentials'}), 401
+        valid, new_hash = password_hasher.verify_and_update(user.password_hash, data['password'])
+        if not valid:
             return jsonify({'error': 'Invalid credentials'}), 401
         
+        if new_hash:
+            # The hashing cost changed; store the password with the new one. A bulk update skips
+            # the password change events, since the password itself is the same
+            User.query.filter_by(id=user.id).update({'password_hash': new_hash})
+        
         # Update last login time
         user.last_login = datetime.utcnow()
         db.session.commit()
         
-        # Create access token
+        # Create access token; role claims let authorization skip the database
         access_token = create_access_token(
             identity=str(user.id),
+            additional_claims={'roles': user_identity(user)['roles']},
             expires_delta=timedelta(days=1)
         )
         
@@ -83,6 +96,9 @@ def login():
             }
         }), 200
         
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -127,15 +143,18 @@ def change_password():
             return jsonify({'error': 'User not found'}), 404
         
         # Verify current password
-        if not check_password_hash(user.password_hash, data['current_password']):
+        if not password_hasher.verify(user.password_hash, data['current_password']):
             return jsonify({'error': 'Current password is incorrect'}), 401
         
         # Update password
-        user.password_hash = generate_password_hash(data['new_password'], method='pbkdf2:sha256')
+        user.password_hash = password_hasher.hash(data['new_password'])
         db.session.commit()
         
         return jsonify({'message': 'Password updated successfully'})
         
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -145,8 +164,9 @@ def change_password():
 def logout():
     """Logout the current user by revoking their token"""
     try:
-        jti = get_jwt()['jti']  # Get the unique identifier for the token
-        blacklist.add(jti)  # Add the token to the blacklist
+        token = get_jwt()
+        # Revoke the token's unique identifier until the token would have expired anyway
+        blacklist.add(token['jti'], token['exp'])
         return jsonify({'message': 'Successfully logged out'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
@@ -3,77 +3,122 @@ from flask_jwt_extended import jwt_required
 from services.file_service import file_service
 from services.groq_service import GroqService
 from services.image_service import ImageService
+from services.interaction_logger import interaction_logger
 from werkzeug.exceptions import BadRequest, NotFound
-import base64
-import magic
-import os
-import PyPDF2
 
 groq_service = GroqService()
 image_service = ImageService()
 
 file_bp = Blueprint('file', __name__)
 
-def get_file_mime_type(file_path):
-    """Get the true MIME type of a file using python-magic"""
-    mime = magic.Magic(mime=True)
-    return mime.from_file(file_path)
-
-def extract_pdf_text(file_path):
-    """Extract text from PDF with page numbers"""
-    pdf_content = []
+def analyze_file_content(session_id, file_id, context=None):
+    """Analyze a session file based on its type"""
     try:
-        with open(file_path, 'rb') as pdf_file:
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            for page_num, page in enumerate(pdf_reader.pages, 1):
-                text = page.extract_text()
-                if text and text.strip():
-                    pdf_content.append(f"Page {page_num}:\n{text.strip()}")
-    except Exception as e:
-        raise RuntimeError(f"Failed to extract text from PDF: {str(e)}")
-    return "\n\n".join(pdf_content) if pdf_content else None
+        file_path = file_service.get_file_record(session_id, file_id)['path']
+        mime_type = file_service.get_file_mime_type(session_id, file_id)
 
-def analyze_file_content(file_path, mime_type, context=None):
-    """Analyze file content based on its type"""
-    try:
         if mime_type.startswith('image/'):
-            with open(file_path, 'rb') as f:
-                base64_image = base64.b64encode(f.read()).decode('utf-8')
-                return groq_service.analyze_image(base64_image)
+            # Ask the same question the batched upload path sends for images
+            return groq_service.analyze_local_image(file_path, context or "What's in this image?")
         
-        elif mime_type == 'application/pdf':
-            content = extract_pdf_text(file_path)
+        # Extraction is memoized so follow-up questions can reference the file by ID
+        content = file_service.get_file_text(session_id, file_id)
+
+        if mime_type == 'application/pdf':
             if not content:
                 raise RuntimeError("No readable text found in PDF")
             return groq_service.analyze_file_content(content, mime_type, context)
         
         elif mime_type.startswith('text/') or mime_type in ['application/json', 'application/xml']:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            if content is None:
+                raise RuntimeError("File is not valid UTF-8 text")
             return groq_service.analyze_file_content(content, mime_type, context)
         
+        elif content is not None:
+            # For other file types, try to analyze the text content
+            return groq_service.analyze_file_content(
+                content,
+                mime_type,
+                "This file type is not directly supported, but I'll try to analyze its text content. " + (context or "")
+            )
+
         else:
-            # For other file types, try to read as text first
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                return groq_service.analyze_file_content(
-                    content,
-                    mime_type,
-                    "This file type is not directly supported, but I'll try to analyze its text content. " + (context or "")
-                )
-            except UnicodeDecodeError:
-                return {
-                    'choices': [{
-                        'message': {
-                            'content': "This file type cannot be analyzed directly. Please provide specific questions about what you'd like to know about this file."
-                        }
-                    }]
-                }
+            return {
+                'choices': [{
+                    'message': {
+                        'content': "This file type cannot be analyzed directly. Please provide specific questions about what you'd like to know about this file."
+                    }
+                }]
+            }
 
     except Exception as e:
         raise RuntimeError(f"Failed to analyze file content: {str(e)}")
 
+def file_query(file_name, context=''):
+    """What the student asked about an uploaded file, as recorded in their interactions"""
+    return f"{file_name}: {context}" if context else file_name
+
+def upload_files_batch(session_id, files, context=''):
+    """Save several files and analyze them, sending all images in shared vision requests"""
+    results = []
+    images = []
+    for file in files:
+        response_data = {
+            'file_id': None,
+            'original_name': file.filename,
+            'type': file.content_type,
+            'analysis': None,
+            'error': None
+        }
+        results.append(response_data)
+        try:
+            if not file.filename:
+                raise ValueError('No file was selected')
+            file_info = file_service.add_file_to_session(session_id, file)
+            response_data['file_id'] = file_info['id']
+            response_data['type'] = file_service.get_file_mime_type(session_id, file_info['id'])
+        except Exception as e:
+            response_data['error'] = str(e)
+            continue
+
+        if response_data['type'].startswith('image/'):
+            images.append((response_data, file_info['path']))
+            continue
+
+        try:
+            result = analyze_file_content(session_id, file_info['id'], context)
+            if result and 'choices' in result:
+                response_data['analysis'] = result['choices'][0]['message']['content']
+            else:
+                response_data['error'] = 'Failed to get AI response'
+        except Exception as e:
+            response_data['error'] = f'Analysis failed: {str(e)}'
+
+    if images:
+        try:
+            image_bytes = []
+            for _, file_path in images:
+                with open(file_path, 'rb') as f:
+                    image_bytes.append(f.read())
+            answers = groq_service.analyze_images(
+                image_bytes,
+                context or "What's in this image?",
+                [response_data['original_name'] for response_data, _ in images]
+            )
+            for (response_data, _), answer in zip(images, answers):
+                response_data['analysis'] = answer
+        except Exception as e:
+            for response_data, _ in images:
+                response_data['error'] = f'Analysis failed: {str(e)}'
+
+    for response_data in results:
+        if response_data['error']:
+            print(f"Error processing file {response_data['original_name']}: {response_data['error']}")
+        elif response_data['analysis']:
+            interaction_logger.log('file', file_query(response_data['original_name'], context), response_data['analysis'],
+                                   request.form.get('subject', 'general'))
+    return results
+
 @file_bp.route('/session/create', methods=['POST'])
 @jwt_required()
 def create_session():
@@ -94,6 +139,11 @@ def upload_file(session_id):
     try:
         if 'file' not in request.files:
             raise BadRequest('No file was uploaded')
+        
+        if len(request.files.getlist('file')) > 1:
+            return jsonify({'files': upload_files_batch(
+                session_id, request.files.getlist('file'), request.form.get('context', '')
+            )})
             
         file = request.files['file']
         if not file.filename:
@@ -110,9 +160,8 @@ def upload_file(session_id):
             }), 400
         
         try:
-            file_path = file_info['path']
             claimed_mime_type = file.content_type
-            actual_mime_type = get_file_mime_type(file_path)
+            actual_mime_type = file_service.get_file_mime_type(session_id, file_info['id'])
             
             response_data = {
                 'file_id': file_info['id'],
@@ -123,7 +172,7 @@ def upload_file(session_id):
             }
             
             try:
-                result = analyze_file_content(file_path, actual_mime_type, context)
+                result = analyze_file_content(session_id, file_info['id'], context)
                 if result and 'choices' in result:
                     response_data['analysis'] = result['choices'][0]['message']['content']
                 else:
@@ -133,6 +182,9 @@ def upload_file(session_id):
             
             if response_data['error']:
                 print(f"Error processing file {file.filename}: {response_data['error']}")
+            else:
+                interaction_logger.log('file', file_query(file_info['original_name'], context), response_data['analysis'],
+                                       request.form.get('subject', 'general'))
             
             return jsonify(response_data)
             
@@ -0,0 +1,129 @@
+import json
+import base64
+import binascii
+from datetime import datetime
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import func, tuple_
+from werkzeug.exceptions import BadRequest
+from models import db
+from models.session import Session, Interaction
+from utils.auth_utils import authorize_session_access, get_current_identity
+
+history_bp = Blueprint('history', __name__)
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# List views show this much of each question; the full text and the answer come from the detail view
+PREVIEW_CHARS = 200
+
+def encode_cursor(timestamp, row_id):
+    """Opaque cursor pointing just past a row, ordered by (timestamp, id)"""
+    return base64.urlsafe_b64encode(json.dumps([timestamp.isoformat(), row_id]).encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise BadRequest('Invalid cursor')
+
+def page_size():
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise BadRequest('limit must be a number')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def keyset_page(query, timestamp_column, id_column):
+    """
+    Newest-first page of query after the request's cursor. Seeking on (timestamp, id)
+    walks the composite index from the cursor, so page 500 costs the same as page 1,
+    unlike OFFSET which reads and discards every earlier row.
+    """
+    limit = page_size()
+    cursor = request.args.get('before')
+    if cursor:
+        query = query.filter(tuple_(timestamp_column, id_column) < tuple_(*decode_cursor(cursor)))
+    # One extra row tells whether there is a next page without counting
+    rows = query.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(getattr(rows[-1], timestamp_column.key), getattr(rows[-1], id_column.key))
+    return rows, next_cursor
+
+@history_bp.route('/sessions', methods=['GET'])
+@jwt_required()
+def list_sessions():
+    """The current user's tutoring sessions, newest first"""
+    try:
+        user_id = int(get_jwt_identity())
+        query = db.session.query(
+            Session.id, Session.subject, Session.start_time, Session.end_time
+        ).filter(Session.user_id == user_id)
+        rows, next_cursor = keyset_page(query, Session.start_time, Session.id)
+        return jsonify({
+            'sessions': [{
+                'id': row.id,
+                'subject': row.subject,
+                'start_time': row.start_time.isoformat(),
+                'end_time': row.end_time.isoformat() if row.end_time else None
+            } for row in rows],
+            'next_cursor': next_cursor
+        })
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400
+
+@history_bp.route('/sessions/<int:session_id>/interactions', methods=['GET'])
+@jwt_required()
+def list_session_interactions(session_id):
+    """A session's interactions, newest first, with a preview of each question and no answers"""
+    try:
+        if not authorize_session_access(session_id, int(get_jwt_identity())):
+            return jsonify({'error': 'Session not found'}), 404
+
+        query = db.session.query(
+            Interaction.id,
+            Interaction.query_type,
+            Interaction.timestamp,
+            func.substr(Interaction.query_content, 1, PREVIEW_CHARS).label('preview')
+        ).filter(Interaction.session_id == session_id)
+        rows, next_cursor = keyset_page(query, Interaction.timestamp, Interaction.id)
+        return jsonify({
+            'interactions': [{
+                'id': row.id,
+                'query_type': row.query_type,
+                'timestamp': row.timestamp.isoformat(),
+                'preview': row.preview
+            } for row in rows],
+            'next_cursor': next_cursor
+        })
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400
+
+@history_bp.route('/interactions/<int:interaction_id>', methods=['GET'])
+@jwt_required()
+def get_interaction(interaction_id):
+    """One interaction in full, including the answer"""
+    row = db.session.query(Interaction, Session.user_id, Session.subject) \
+        .join(Session, Interaction.session_id == Session.id) \
+        .filter(Interaction.id == interaction_id).first()
+    if row is None:
+        return jsonify({'error': 'Interaction not found'}), 404
+
+    interaction, owner_id, subject = row
+    if owner_id != int(get_jwt_identity()):
+        identity = get_current_identity()
+        if not identity or 'admin' not in identity['roles']:
+            return jsonify({'error': 'Interaction not found'}), 404
+
+    return jsonify({
+        'id': interaction.id,
+        'session_id': interaction.session_id,
+        'subject': subject,
+        'query_type': interaction.query_type,
+        'query_content': interaction.query_content,
+        'response': interaction.response,
+        'timestamp': interaction.timestamp.isoformat()
+    })
@@ -1,5 +1,7 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from services.screen_service import ScreenService, DESKTOP_USE_AVAILABLE
+from services.screen_delta import pack_binary_message
+import json
 from services.groq_service import GroqService
 
 screen_bp = Blueprint('screen', __name__)
@@ -22,18 +24,62 @@ def screen_service_status():
 
 @screen_bp.route('/capture', methods=['GET'])
 def capture_screen():
-    """Capture current screen content"""
-    return jsonify(screen_service.capture_screen_content())
+    """Capture current screen content, optionally as a delta against the client's last frame"""
+    if request.args.get('mode') == 'delta':
+        return jsonify(screen_service.capture_screen_delta(
+            request.args.get('client_id', 'default'),
+            force_keyframe=request.args.get('keyframe') in ('1', 'true')
+        ))
+    
+    # Encoder profile and per-request overrides; malformed numbers are ignored
+    overrides = {
+        'format': request.args.get('format'),
+        'quality': request.args.get('quality', type=int),
+        'compress_level': request.args.get('compress_level', type=int),
+        'scale': request.args.get('scale', type=float),
+        'grayscale': request.args.get('grayscale') in ('1', 'true') if 'grayscale' in request.args else None
+    }
+    return jsonify(screen_service.capture_screen_content(request.args.get('profile'), **overrides))
+
+@screen_bp.route('/stream', methods=['GET'])
+def stream_screen():
+    """
+    Push screen changes as they are captured.
+    format=binary (default) streams length-prefixed binary messages with raw PNG tiles;
+    format=sse streams Server-Sent Events with base64 tiles for EventSource clients.
+    """
+    if request.args.get('format') == 'sse':
+        def generate_sse():
+            for result in screen_service.stream_frames(raw=False):
+                if result is None:
+                    yield ": keepalive\n\n"
+                else:
+                    yield f"event: frame\ndata: {json.dumps(result)}\n\n"
+        mimetype = 'text/event-stream'
+        body = generate_sse()
+    else:
+        def generate_binary():
+            for result in screen_service.stream_frames(raw=True):
+                yield pack_binary_message(result or {'type': 'keepalive'})
+        mimetype = 'application/octet-stream'
+        body = generate_binary()
+    
+    return Response(body, mimetype=mimetype, headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Stop reverse proxies from buffering the stream
+    })
 
 @screen_bp.route('/start', methods=['POST'])
 def start_monitoring():
     """Start screen monitoring"""
+    # Screen capture only needs PIL, so the capture loop runs either way
+    result = screen_service.start_monitoring()
     if not DESKTOP_USE_AVAILABLE:
         return jsonify({
             'status': 'limited',
             'message': 'Started with limited functionality - desktop_use features not available'
         })
-    return jsonify(screen_service.start_monitoring())
+    return jsonify(result)
 
 @screen_bp.route('/stop', methods=['POST'])
 def stop_monitoring():
@@ -49,14 +95,37 @@ def analyze_screen_content():
             'message': 'Operating with limited functionality'
         })
     
-    data = request.json
+    data = request.json or {}
     content = data.get('content', '')
     subject = data.get('subject', 'general')
+    session_id = str(data.get('session_id', 'default'))
+    # force skips the cache, e.g. when the student explicitly asks for a fresh look
+    force = bool(data.get('force', False))
     
+    cache = screen_service.analysis_cache
+    image_hash = None
+    cached = None
     if not content:
         # If no content provided, capture from screen
-        screen_data = screen_service.capture_screen_content()
-        content = screen_data.get('content', '')
+        screen_data = screen_service.capture_for_analysis()
+        image_hash = screen_data.get('image_hash')
+        if not force:
+            # A screen that looks the same as last time needs neither text extraction nor the LLM
+            cached = cache.lookup(session_id, subject, image_hash=image_hash)
+        if cached is None and 'frame' in screen_data:
+            # Text-only prompts are far cheaper than sending the frame to the vision model
+            content = screen_service.extract_screen_text(screen_data['frame']).get('text', '')
+    
+    if cached is None and content and not force:
+        cached = cache.lookup(session_id, subject, text=content)
+    
+    if cached is not None:
+        return jsonify({
+            'original_content': cached['content'],
+            'analysis': cached['analysis'],
+            'cached': True,
+            'status': 'success' if DESKTOP_USE_AVAILABLE else 'limited'
+        })
     
     if not content:
         return jsonify({'error': 'No content available for analysis'}), 400
@@ -75,13 +144,35 @@ def analyze_screen_content():
     """
     
     analysis = groq_service.complete_prompt(prompt)
+    cache.store(session_id, subject, content, analysis, image_hash=image_hash)
     
     return jsonify({
         'original_content': content,
         'analysis': analysis,
+        'cached': False,
         'status': 'success' if DESKTOP_USE_AVAILABLE else 'limited'
     })
 
+@screen_bp.route('/window-text', methods=['GET'])
+def active_window_text():
+    """Text of the active window with what changed since the last request"""
+    if not DESKTOP_USE_AVAILABLE or not screen_service.is_connected:
+        return jsonify({
+            'error': 'Desktop use functionality not available',
+            'status': 'failed'
+        }), 503
+    
+    window_info = screen_service._get_active_window()
+    if not window_info:
+        return jsonify({'error': 'No active window', 'status': 'failed'}), 404
+    
+    result = screen_service.extract_window_text(window_info, full_scan=request.args.get('full') in ('1', 'true'))
+    if 'error' in result:
+        return jsonify({'error': result['error'], 'status': 'failed'}), 500
+    
+    result.update({'window': window_info, 'status': 'success'})
+    return jsonify(result)
+
 @screen_bp.route('/monitor-app', methods=['POST'])
 def monitor_specific_application():
     """Monitor a specific application (e.g., calculator, notepad)"""
@@ -105,4 +196,46 @@ def monitor_specific_application():
     
     monitoring_result = screen_service.monitor_math_application(app_name)
     
-    return jsonify(monitoring_result)
\ No newline at end of file
+    return jsonify(monitoring_result)
+
+@screen_bp.route('/monitor-app/stream', methods=['GET'])
+def stream_application_changes():
+    """Push value changes of a watched application as Server-Sent Events"""
+    if not DESKTOP_USE_AVAILABLE or not screen_service.is_connected:
+        return jsonify({
+            'error': 'Desktop use functionality not available',
+            'status': 'failed'
+        }), 503
+    
+    app_name = request.args.get('application', '')
+    if not app_name:
+        return jsonify({'error': 'Application name is required'}), 400
+    
+    try:
+        events = screen_service.application_events(app_name)
+        # Open the application before the response starts so failures get a proper status
+        first = next(events)
+    except Exception as e:
+        return jsonify({'error': str(e), 'status': 'failed'}), 500
+    
+    def generate():
+        yield f"event: snapshot\ndata: {json.dumps(first)}\n\n"
+        for event in events:
+            if event is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: change\ndata: {json.dumps(event)}\n\n"
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@screen_bp.route('/monitor-app/stop', methods=['POST'])
+def stop_monitoring_application():
+    """Stop watching an application"""
+    data = request.json or {}
+    app_name = data.get('application', '')
+    if not app_name:
+        return jsonify({'error': 'Application name is required'}), 400
+    return jsonify(screen_service.stop_watching(app_name))
@@ -1,8 +1,11 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from services.groq_service import GroqService
 from services.image_service import ImageService
 from services.speech_service import SpeechService
+from services.interaction_logger import interaction_logger, current_user_id
 import os
+import json
+import time
 
 tutor_bp = Blueprint('tutor', __name__)
 
@@ -34,6 +37,7 @@ def process_text_problem():
         )
         result['translated'] = translated
     
+    interaction_logger.log('text', problem_text, result, subject)
     return jsonify(result)
 
 @tutor_bp.route('/process-image', methods=['POST'])
@@ -42,12 +46,18 @@ def process_image_problem():
     if 'image' not in request.files:
         return jsonify({'error': 'No image provided'}), 400
     
-    image_file = request.files['image']
+    image_files = request.files.getlist('image')
     subject = request.form.get('subject', 'mathematics')
     language = request.form.get('language', 'english')
     
-    # Process image to extract text/math
-    extracted_text = image_service.extract_text_from_image(image_file)
+    # Process image to extract text/math; multi-page submissions are OCR'd in parallel
+    if len(image_files) > 1:
+        page_texts = image_service.extract_text_from_images(image_files)
+        extracted_text = "\n\n".join(
+            f"Page {page_num}:\n{text}" for page_num, text in enumerate(page_texts, 1)
+        )
+    else:
+        extracted_text = image_service.extract_text_from_image(image_files[0])
     
     if not extracted_text:
         return jsonify({'error': 'Could not extract text from image'}), 400
@@ -63,6 +73,7 @@ def process_image_problem():
         )
         result['translated'] = translated
     
+    interaction_logger.log('image', extracted_text, result, subject)
     return jsonify(result)
 
 @tutor_bp.route('/process-speech', methods=['POST'])
@@ -71,21 +82,99 @@ def process_speech_problem():
     if 'audio' not in request.files:
         return jsonify({'error': 'No audio provided'}), 400
     
+    start = time.perf_counter()
     audio_file = request.files['audio']
     subject = request.form.get('subject', 'mathematics')
     language = request.form.get('language', 'english')
     
     # Convert speech to text
     transcribed_text = speech_service.transcribe_audio(audio_file, language)
+    transcribed = time.perf_counter()
     
     if not transcribed_text:
         return jsonify({'error': 'Could not transcribe audio'}), 400
     
     # Process with Groq
     result = groq_service.process_math_problem(transcribed_text, subject)
-    
+    finished = time.perf_counter()
+    
+    result['timings'] = {
+        'transcription': round(transcribed - start, 3),
+        'completion': round(finished - transcribed, 3),
+        'total': round(finished - start, 3)
+    }
+    interaction_logger.log('voice', transcribed_text, result, subject)
     return jsonify(result)
 
+@tutor_bp.route('/process-speech/stream', methods=['POST'])
+def process_speech_problem_stream():
+    """
+    Process a spoken problem as Server-Sent Events: the stream opens straight away with
+    partial transcripts while recognition runs, and the final transcript is handed to a
+    streaming completion the moment it is ready, whose answer follows piece by piece
+    """
+    if 'audio' not in request.files:
+        return jsonify({'error': 'No audio provided'}), 400
+    
+    start = time.perf_counter()
+    audio = request.files['audio'].read()
+    subject = request.form.get('subject', 'mathematics')
+    language = request.form.get('language', 'english')
+    
+    try:
+        transcription = speech_service.transcribe_stream(audio, language)
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 503
+    
+    timings = {}
+    # The stream is generated after the request context is gone
+    user_id = current_user_id()
+    
+    def event(name, data):
+        return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+    
+    def generate():
+        for result in transcription:
+            if result.get('done'):
+                break
+            yield event('partial', {'text': result['text'], 'is_final': result['is_final']})
+        transcribed = time.perf_counter()
+        timings['transcription'] = round(transcribed - start, 3)
+        
+        if result['error']:
+            yield event('error', {'error': result['error'], 'timings': timings})
+            return
+        text = result['text']
+        if not text:
+            yield event('error', {'error': 'Could not transcribe audio', 'timings': timings})
+            return
+        yield event('transcript', {'text': text, 'audio': result['audio'], 'timings': dict(timings)})
+        
+        answer = []
+        try:
+            for piece in groq_service.stream_math_problem(text, subject):
+                if not answer:
+                    first_token = time.perf_counter()
+                    timings['completion_first_token'] = round(first_token - transcribed, 3)
+                    timings['first_token'] = round(first_token - start, 3)
+                answer.append(piece)
+                yield event('answer', {'text': piece})
+        except RuntimeError as e:
+            yield event('error', {'error': str(e), 'timings': timings})
+            return
+        
+        finished = time.perf_counter()
+        timings['completion'] = round(finished - transcribed, 3)
+        timings['total'] = round(finished - start, 3)
+        if user_id is not None:
+            interaction_logger.log('voice', text, ''.join(answer), subject, user_id=user_id)
+        yield event('done', {'transcript': text, 'answer': ''.join(answer), 'timings': timings})
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @tutor_bp.route('/languages', methods=['GET'])
 def get_supported_languages():
     """Return list of supported languages"""
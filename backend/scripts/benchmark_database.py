@@ -0,0 +1,101 @@
+"""
+Compare SQLite with default settings against the tuned engine configuration under
+concurrent logins and interaction writes.
+
+Usage: python scripts/benchmark_database.py [threads] [operations_per_thread]
+
+Each thread alternates a login (look the user up by email, update last_login) with
+logging an interaction, committing after each, like the auth and tutor routes do.
+Password hashing is left out so only database time is measured.
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from config import database_engine_options
+from models import db, configure_sqlite_connection
+from models.user import User
+from models.session import Session, Interaction
+
+RESPONSE_TEXT = "Step 1: subtract 7 from both sides. " * 20
+
+def make_app(path, tuned):
+    app = Flask(__name__)
+    uri = f'sqlite:///{path}'
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = database_engine_options(uri) if tuned else {}
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+def seed(app, users):
+    with app.app_context():
+        db.create_all()
+        for index in range(users):
+            user = User(username=f'student{index}', email=f'student{index}@example.com', password_hash='x')
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(Session(user_id=user.id, subject='mathematics'))
+        db.session.commit()
+
+def worker(app, index, operations, latencies, errors):
+    email = f'student{index}@example.com'
+    with app.app_context():
+        session_id = Session.query.join(User).filter(User.email == email).first().id
+        for operation in range(operations):
+            start = time.perf_counter()
+            try:
+                if operation % 2 == 0:
+                    user = User.query.filter_by(email=email).first()
+                    user.last_login = datetime.utcnow()
+                else:
+                    db.session.add(Interaction(session_id=session_id, query_type='text',
+                                               query_content='Solve 3x + 7 = 22', response=RESPONSE_TEXT))
+                db.session.commit()
+                latencies.append(time.perf_counter() - start)
+            except OperationalError:
+                db.session.rollback()
+                errors.append(operation)
+        db.session.remove()
+
+def run_mode(tuned, threads, operations):
+    if tuned and not event.contains(Engine, 'connect', configure_sqlite_connection):
+        event.listen(Engine, 'connect', configure_sqlite_connection)
+    elif not tuned and event.contains(Engine, 'connect', configure_sqlite_connection):
+        event.remove(Engine, 'connect', configure_sqlite_connection)
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = make_app(path, tuned)
+    seed(app, threads)
+
+    latencies, errors = [], []
+    pool = [threading.Thread(target=worker, args=(app, index, operations, latencies, errors)) for index in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0.0
+    return len(latencies) / elapsed, p95, len(errors)
+
+def run_benchmark(threads=8, operations=200):
+    print(f"{threads} threads x {operations} operations\n")
+    print(f"{'engine':<8} {'ops/s':>8} {'p95':>9} {'errors':>7}")
+    for name, tuned in (('default', False), ('tuned', True)):
+        rate, p95, errors = run_mode(tuned, threads, operations)
+        print(f"{name:<8} {rate:>8.0f} {p95 * 1000:>6.1f} ms {errors:>7}")
+
+if __name__ == "__main__":
+    run_benchmark(*(int(arg) for arg in sys.argv[1:3]))
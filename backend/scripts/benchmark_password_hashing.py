@@ -0,0 +1,89 @@
+"""
+Measure login throughput at different password hashing costs, and how much a login
+burst slows other requests when hashing runs inline versus on the bounded pool.
+
+Usage: python scripts/benchmark_password_hashing.py [burst_size]
+
+Each run starts burst_size concurrent "logins" (one thread each, like request threads)
+while a probe thread repeatedly does a small piece of CPU work standing in for another
+route; the probe's p95 latency shows the cost a burst imposes on the rest of the API.
+"""
+import os
+import sys
+import time
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from werkzeug.security import generate_password_hash, check_password_hash
+from services.password_service import PasswordHasher
+
+ITERATIONS = [100000, 310000, 600000, 1000000]
+POOL_WORKERS = [1, 2, 4]
+PASSWORD = "correct horse battery staple"
+
+def probe_work():
+    """About a millisecond of JSON work, like serializing a response"""
+    payload = {"steps": [{"index": i, "text": "x" * 40} for i in range(200)]}
+    for _ in range(5):
+        json.loads(json.dumps(payload))
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+def measure_probe(stop):
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        probe_work()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def run_burst(verify, burst_size):
+    """Logins per second, p95 login latency and p95 probe latency during a burst"""
+    stop = threading.Event()
+    with ThreadPoolExecutor(max_workers=1) as probe_pool:
+        probe = probe_pool.submit(measure_probe, stop)
+        login_latencies = []
+
+        def login():
+            start = time.perf_counter()
+            verify()
+            login_latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=login) for _ in range(burst_size)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        probe_latencies = probe.result()
+    return burst_size / elapsed, percentile(login_latencies, 0.95), percentile(probe_latencies, 0.95)
+
+def run_benchmark(burst_size=32):
+    stop = threading.Event()
+    timer = threading.Timer(1.0, stop.set)
+    timer.start()
+    baseline = percentile(measure_probe(stop), 0.95)
+    print(f"{os.cpu_count()} CPUs, burst of {burst_size} logins")
+    print(f"Probe p95 with no logins: {baseline * 1000:.1f} ms\n")
+    print(f"{'iterations':>10} {'mode':<8} {'logins/s':>9} {'login p95':>10} {'probe p95':>10}")
+
+    for iterations in ITERATIONS:
+        stored = generate_password_hash(PASSWORD, f'pbkdf2:sha256:{iterations}')
+        modes = [('inline', lambda: check_password_hash(stored, PASSWORD))]
+        for workers in POOL_WORKERS:
+            hasher = PasswordHasher(iterations=iterations, workers=workers, max_pending=burst_size)
+            modes.append((f'pool={workers}', lambda hasher=hasher: hasher.verify(stored, PASSWORD)))
+
+        for mode, verify in modes:
+            rate, login_p95, probe_p95 = run_burst(verify, burst_size)
+            print(f"{iterations:>10} {mode:<8} {rate:>9.1f} {login_p95 * 1000:>8.0f} ms {probe_p95 * 1000:>7.1f} ms")
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 32)
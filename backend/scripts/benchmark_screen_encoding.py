@@ -0,0 +1,99 @@
+"""
+Compare screen encoder profiles on synthetic screen fixtures.
+
+Usage: python scripts/benchmark_screen_encoding.py [repeats]
+
+Reports mean encode time and encoded size per profile for a code editor,
+a document and a video-like frame at 1080p and 4K.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from services.screen_encoding import SCREEN_PROFILES, encode_screen, resolve_profile
+
+CODE_LINES = [
+    "def solve_quadratic(a, b, c):",
+    "    discriminant = b ** 2 - 4 * a * c",
+    "    if discriminant < 0:",
+    "        return None",
+    "    root = discriminant ** 0.5",
+    "    return (-b + root) / (2 * a), (-b - root) / (2 * a)",
+]
+
+def _font(size):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1 only has the small bitmap font
+        return ImageFont.load_default()
+
+def code_editor(size):
+    """Dark editor theme with syntax-coloured lines and a sidebar"""
+    image = Image.new("RGB", size, (30, 30, 30))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, size[0] // 6, size[1]), fill=(37, 37, 38))
+    font = _font(size[1] // 60)
+    colours = [(86, 156, 214), (206, 145, 120), (181, 206, 168), (212, 212, 212)]
+    line_height = size[1] // 45
+    for line_num in range(size[1] // line_height):
+        text = CODE_LINES[line_num % len(CODE_LINES)]
+        draw.text((size[0] // 6 + 20, line_num * line_height), text, fill=colours[line_num % 4], font=font)
+    return image
+
+def document(size):
+    """White page of black text with a toolbar"""
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, size[0], size[1] // 20), fill=(240, 240, 240))
+    font = _font(size[1] // 50)
+    line_height = size[1] // 35
+    for line_num in range(2, size[1] // line_height):
+        draw.text((size[0] // 8, line_num * line_height),
+                  "The derivative measures how a function changes as its input changes.", fill="black", font=font)
+    return image
+
+def video(size):
+    """Smooth gradients with noise, like a lecture video or photo"""
+    x = np.linspace(0, 1, size[0], dtype=np.float32)[None, :, None]
+    y = np.linspace(0, 1, size[1], dtype=np.float32)[:, None, None]
+    x, y = np.broadcast_arrays(x, y)
+    base = np.concatenate([x * 255, y * 255, (1 - x) * (1 - y) * 255], axis=2)
+    noise = np.random.default_rng(0).normal(0, 12, base.shape)
+    return Image.fromarray(np.clip(base + noise, 0, 255).astype(np.uint8))
+
+FIXTURES = {
+    'code': code_editor,
+    'document': document,
+    'video': video,
+}
+RESOLUTIONS = {
+    '1080p': (1920, 1080),
+    '4K': (3840, 2160),
+}
+
+def run_benchmark(repeats=3):
+    profiles = {}
+    for name in SCREEN_PROFILES:
+        try:
+            profiles[name] = resolve_profile(name)
+        except ValueError as e:
+            print(f"Skipping {name}: {e}")
+
+    for resolution, size in RESOLUTIONS.items():
+        for fixture_name, make_fixture in FIXTURES.items():
+            image = make_fixture(size)
+            print(f"\n{fixture_name} {resolution}")
+            for name, profile in profiles.items():
+                start = time.perf_counter()
+                for _ in range(repeats):
+                    data, _ = encode_screen(image, profile)
+                elapsed = (time.perf_counter() - start) / repeats
+                print(f"  {name:<10} {elapsed * 1000:8.1f} ms {len(data) / 1024:10.1f} KB")
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+# Elements worth watching per application, as name -> selector within the app window.
+# A None selector reads the text of the whole window.
+APPLICATION_TARGETS = {
+    'calculator': {'current_value': 'name:CalculatorResults'},
+}
+DEFAULT_TARGETS = {'window_text': None}
+
+class ApplicationWatcher:
+    """
+    Watches elements of one application window through the desktop_use accessibility API
+    on a background thread, recording a change event whenever a value differs from the
+    last read. Locators are built once and reused until a read fails. The poll interval
+    drops to min_interval while values are changing and backs off while they are idle.
+    """
+
+    def __init__(self, client, app_name: str, targets: Dict[str, Optional[str]] = None,
+                 min_interval: float = None, max_interval: float = None, backoff: float = 1.5,
+                 open_timeout: float = 5.0, buffer_size: int = 50):
+        """client is a DesktopUseClient or anything with the same locator interface"""
+        self.client = client
+        self.app_name = app_name
+        self.targets = targets or APPLICATION_TARGETS.get(app_name.lower(), DEFAULT_TARGETS)
+        self.min_interval = min_interval or float(os.environ.get('APP_WATCH_MIN_INTERVAL', 0.2))
+        self.max_interval = max_interval or float(os.environ.get('APP_WATCH_MAX_INTERVAL', 2.0))
+        self.backoff = backoff
+        self.open_timeout = open_timeout
+        self.interval = self.min_interval
+        self.values = {}
+        self.events = deque(maxlen=buffer_size)
+        self.sequence = 0
+        self._window = None
+        self._locators = None
+        self._lock = threading.Lock()
+        self._new_event = threading.Condition(self._lock)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def is_running(self) -> bool:
+        """Check if the watch thread is alive"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def open(self) -> None:
+        """Open the application and wait until its window is visible, instead of sleeping a fixed time"""
+        self.client.open_application(self.app_name)
+        self._build_locators()
+        self._window.expect_visible(timeout=int(self.open_timeout * 1000))
+
+    def _build_locators(self) -> Dict[str, Any]:
+        """Locators for the window and every target, cached until a read fails"""
+        if self._locators is None:
+            self._window = self.client.locator(f'window:{self.app_name}')
+            self._locators = {
+                name: self._window.locator(selector) if selector else self._window
+                for name, selector in self.targets.items()
+            }
+        return self._locators
+
+    def read_values(self) -> Dict[str, Optional[str]]:
+        """Current text of every target"""
+        try:
+            values = {}
+            for name, locator in self._build_locators().items():
+                result = locator.get_text()
+                values[name] = result.text if hasattr(result, 'text') else None
+            return values
+        except Exception:
+            # The window may have closed or been recreated; rebuild the locators next time
+            self._locators = None
+            raise
+
+    def start(self) -> None:
+        """Start the watch thread if it is not already running"""
+        with self._lock:
+            if self.is_running:
+                return
+            self._stop_event.clear()
+            self.interval = self.min_interval
+            self._thread = threading.Thread(target=self._run, name=f'app-watch-{self.app_name}', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the watch thread and wait for it to exit"""
+        self._stop_event.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=self.max_interval + 1)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Watching {self.app_name} failed: {e}")
+                self.interval = self.max_interval
+            self._stop_event.wait(self.interval)
+
+    def poll_once(self) -> Optional[Dict[str, Any]]:
+        """Read every target once, returning a change event if any value changed"""
+        values = self.read_values()
+        changes = {name: {"old": self.values.get(name), "new": value}
+                   for name, value in values.items() if value != self.values.get(name)}
+
+        if not changes:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+            return None
+        self.interval = self.min_interval
+
+        with self._lock:
+            self.values = values
+            self.sequence += 1
+            event = {
+                "application": self.app_name,
+                "sequence": self.sequence,
+                "timestamp": time.time(),
+                "values": dict(values),
+                "changes": changes
+            }
+            self.events.append(event)
+            self._new_event.notify_all()
+        return event
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Last values read and the sequence of the latest change"""
+        with self._lock:
+            return {
+                "application": self.app_name,
+                "sequence": self.sequence,
+                "values": dict(self.values),
+                "watching": self.is_running
+            }
+
+    def wait_for_event(self, after_sequence: int = 0, timeout: float = None) -> List[Dict[str, Any]]:
+        """
+        Block until there are change events newer than after_sequence and return them, oldest
+        first. Unlike screen frames every value change matters, so missed events are replayed
+        from the buffer.
+        """
+        with self._new_event:
+            self._new_event.wait_for(lambda: self.sequence > after_sequence, timeout=timeout)
+            return [event for event in self.events if event["sequence"] > after_sequence]
@@ -0,0 +1,196 @@
+import os
+import io
+import wave
+import shutil
+import subprocess
+import threading
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+
+TARGET_SAMPLE_RATE = 16000
+# VAD works on 20 ms frames
+VAD_FRAME_SECONDS = 0.02
+# Speech must be this far above the noise floor, and never quieter than the absolute floor
+VAD_THRESHOLD_DB = 10.0
+VAD_MIN_SPEECH_DB = -50.0
+# Audio kept around detected speech so soft word onsets and endings survive trimming
+VAD_PADDING_SECONDS = 0.2
+# Internal pauses longer than this are shortened to it
+MAX_PAUSE_SECONDS = 0.5
+
+class AudioDecodeError(Exception):
+    """Raised when audio cannot be decoded to PCM"""
+
+def _decode_wav(audio: bytes) -> Tuple[np.ndarray, int]:
+    """PCM WAV to float32 samples in [-1, 1] with shape (frames, channels)"""
+    try:
+        with wave.open(io.BytesIO(audio)) as wav:
+            width, channels, rate = wav.getsampwidth(), wav.getnchannels(), wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError) as e:
+        raise AudioDecodeError(f"Unsupported WAV file: {e}") from e
+
+    if width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width in (2, 4):
+        dtype = np.int16 if width == 2 else np.int32
+        samples = np.frombuffer(frames, dtype=dtype).astype(np.float32) / np.iinfo(dtype).max
+    else:
+        raise AudioDecodeError(f"Unsupported WAV sample width: {width * 8} bits")
+    return samples.reshape(-1, channels), rate
+
+def _decode_ffmpeg(audio: bytes, sample_rate: int) -> Tuple[np.ndarray, int]:
+    """Any container ffmpeg understands to mono float32 samples at sample_rate"""
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        raise AudioDecodeError("ffmpeg is required to decode compressed audio")
+    process = subprocess.run(
+        [ffmpeg, '-hide_banner', '-loglevel', 'error', '-i', 'pipe:0',
+         '-f', 's16le', '-ac', '1', '-ar', str(sample_rate), 'pipe:1'],
+        input=audio, capture_output=True, timeout=60
+    )
+    if process.returncode != 0:
+        raise AudioDecodeError(f"ffmpeg could not decode audio: {process.stderr.decode(errors='replace').strip()}")
+    samples = np.frombuffer(process.stdout, dtype=np.int16).astype(np.float32) / 32767
+    return samples.reshape(-1, 1), sample_rate
+
+def decode_audio(audio: bytes, sample_rate: int = TARGET_SAMPLE_RATE) -> Tuple[np.ndarray, int]:
+    """
+    Decode browser recordings (WebM/Ogg Opus, MP4, MP3) or WAV to float32 samples of shape
+    (frames, channels). WAV is decoded in-process; other formats need ffmpeg, which also
+    resamples them on the way.
+    """
+    if audio.startswith(b'RIFF') and audio[8:12] == b'WAVE':
+        return _decode_wav(audio)
+    return _decode_ffmpeg(audio, sample_rate)
+
+def resample(samples: np.ndarray, source_rate: int, target_rate: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """Resample mono audio, low-pass filtering first when downsampling so nothing aliases"""
+    if source_rate == target_rate or len(samples) == 0:
+        return samples
+    if target_rate < source_rate:
+        # Windowed-sinc low-pass at the new Nyquist frequency
+        cutoff = target_rate / source_rate / 2
+        taps = np.arange(-32, 33)
+        kernel = np.sinc(2 * cutoff * taps) * 2 * cutoff * np.hanning(len(taps))
+        samples = np.convolve(samples, (kernel / kernel.sum()).astype(np.float32), mode='same')
+    duration = len(samples) / source_rate
+    positions = np.arange(int(duration * target_rate)) * (source_rate / target_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+def speech_mask(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """
+    Energy-based voice activity per VAD frame: frames well above the recording's noise
+    floor are speech, then every speech frame is padded on both sides
+    """
+    frame = int(sample_rate * VAD_FRAME_SECONDS)
+    count = len(samples) // frame
+    if count == 0:
+        return np.zeros(0, dtype=bool)
+    frames = samples[:count * frame].reshape(count, frame)
+    energy_db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    # Quiet frames dominate the low percentiles, whatever the microphone gain
+    noise_floor, loud = np.percentile(energy_db, [10, 90])
+    if loud - noise_floor < VAD_THRESHOLD_DB:
+        # No distinguishable silence: all speech, or all background
+        return np.full(count, loud > VAD_MIN_SPEECH_DB)
+    speech = energy_db > max(noise_floor + VAD_THRESHOLD_DB, VAD_MIN_SPEECH_DB)
+
+    padding = int(VAD_PADDING_SECONDS / VAD_FRAME_SECONDS)
+    if padding and speech.any():
+        # Dilate with a running window sum
+        window = np.convolve(speech.astype(np.int32), np.ones(2 * padding + 1, dtype=np.int32), mode='same')
+        speech = window > 0
+    return speech
+
+def trim_silence(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """Drop leading and trailing silence and shorten long pauses to MAX_PAUSE_SECONDS"""
+    speech = speech_mask(samples, sample_rate)
+    if not speech.any():
+        return samples[:0]
+    frame = int(sample_rate * VAD_FRAME_SECONDS)
+    keep = speech.copy()
+
+    # Pauses run from the end of one speech run to the start of the next;
+    # keep MAX_PAUSE_SECONDS from the middle of each
+    max_pause = int(MAX_PAUSE_SECONDS / VAD_FRAME_SECONDS)
+    edges = np.diff(np.concatenate(([0], speech.astype(np.int8), [0])))
+    speech_starts, speech_ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    for start, end in zip(speech_ends[:-1], speech_starts[1:]):
+        if end - start > max_pause:
+            middle = (start + end) // 2
+            keep[middle - max_pause // 2:middle - max_pause // 2 + max_pause] = True
+        else:
+            keep[start:end] = True
+
+    sample_keep = np.repeat(keep, frame)
+    # Samples past the last whole frame belong to trailing silence unless the last frame is speech
+    sample_keep = np.concatenate([sample_keep, np.full(len(samples) - len(sample_keep), keep[-1])])
+    return samples[sample_keep]
+
+def encode_wav(samples: np.ndarray, sample_rate: int) -> bytes:
+    """Mono float32 samples to 16-bit PCM WAV"""
+    buffered = io.BytesIO()
+    with wave.open(buffered, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes((np.clip(samples, -1, 1) * 32767).astype('<i2').tobytes())
+    return buffered.getvalue()
+
+class AudioNormalizer:
+    """
+    Turns recordings into 16 kHz mono 16-bit PCM with silence trimmed before transcription,
+    so recognition is billed for, uploads and waits on speech only. Tracks seconds saved.
+    """
+
+    def __init__(self, sample_rate: int = None, trim: bool = None):
+        self.sample_rate = sample_rate or int(os.environ.get('AUDIO_SAMPLE_RATE', TARGET_SAMPLE_RATE))
+        self.trim = trim if trim is not None else os.environ.get('AUDIO_TRIM_SILENCE', '1') != '0'
+        self._lock = threading.Lock()
+        self.recordings = 0
+        self.original_seconds = 0.0
+        self.processed_seconds = 0.0
+
+    def normalize(self, audio: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Normalized WAV bytes with before/after durations and sizes, or None when the
+        audio cannot be decoded here and should be sent as-is
+        """
+        try:
+            samples, rate = decode_audio(audio, self.sample_rate)
+        except AudioDecodeError as e:
+            print(f"Audio normalization skipped: {e}")
+            return None
+
+        original_seconds = len(samples) / rate
+        samples = resample(samples.mean(axis=1), rate, self.sample_rate)
+        if self.trim:
+            samples = trim_silence(samples, self.sample_rate)
+        processed_seconds = len(samples) / self.sample_rate
+
+        with self._lock:
+            self.recordings += 1
+            self.original_seconds += original_seconds
+            self.processed_seconds += processed_seconds
+
+        return {
+            'audio': encode_wav(samples, self.sample_rate) if len(samples) else b'',
+            'original_seconds': round(original_seconds, 2),
+            'processed_seconds': round(processed_seconds, 2),
+            'seconds_saved': round(original_seconds - processed_seconds, 2),
+            'original_bytes': len(audio)
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Totals of audio received and sent for recognition since startup"""
+        with self._lock:
+            return {
+                'recordings': self.recordings,
+                'original_seconds': round(self.original_seconds, 2),
+                'processed_seconds': round(self.processed_seconds, 2),
+                'seconds_saved': round(self.original_seconds - self.processed_seconds, 2)
+            }
+
+# Shared so the savings cover every transcription in the process
+audio_normalizer = AudioNormalizer()
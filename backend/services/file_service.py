@@ -4,6 +4,40 @@ from werkzeug.utils import secure_filename
 import tempfile
 import uuid
 from datetime import datetime, timedelta
+from typing import Optional
+import magic
+import PyPDF2
+
+def get_file_mime_type(file_path):
+    """Get the true MIME type of a file using python-magic"""
+    mime = magic.Magic(mime=True)
+    return mime.from_file(file_path)
+
+def extract_pdf_text(file_path):
+    """Extract text from PDF with page numbers"""
+    pdf_content = []
+    try:
+        with open(file_path, 'rb') as pdf_file:
+            pdf_reader = PyPDF2.PdfReader(pdf_file)
+            for page_num, page in enumerate(pdf_reader.pages, 1):
+                text = page.extract_text()
+                if text and text.strip():
+                    pdf_content.append(f"Page {page_num}:\n{text.strip()}")
+    except Exception as e:
+        raise RuntimeError(f"Failed to extract text from PDF: {str(e)}")
+    return "\n\n".join(pdf_content) if pdf_content else None
+
+def extract_file_text(file_path, mime_type):
+    """Extract readable text from a file, or None if it has no text form"""
+    if mime_type == 'application/pdf':
+        return extract_pdf_text(file_path)
+    if mime_type.startswith('image/'):
+        return None
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except UnicodeDecodeError:
+        return None
 
 class FileService:
     def __init__(self, base_temp_dir=None):
@@ -29,7 +63,8 @@ class FileService:
         os.makedirs(session_dir, exist_ok=True)
         self.session_dirs[session_id] = {
             'path': session_dir,
-            'created_at': datetime.now()
+            'created_at': datetime.now(),
+            'files': {}  # Map of file_id to path, MIME type and memoized text
         }
         return session_dir
 
@@ -42,9 +77,14 @@ class FileService:
     def add_file_to_session(self, session_id: str, file) -> dict:
         """Add a file to a session"""
         try:
-            file_info = self.save_file(file, session_id)
+            file_id = str(uuid.uuid4())
+            file_info = self.save_file(file, session_id, file_id)
+            self.session_dirs[session_id]['files'][file_id] = {
+                'path': file_info['path'],
+                'mime_type': None
+            }
             return {
-                'id': str(uuid.uuid4()),
+                'id': file_id,
                 'original_name': file.filename,
                 'path': file_info['path']
             }
@@ -53,7 +93,7 @@ class FileService:
         except Exception as e:
             raise RuntimeError(f"Failed to add file to session: {str(e)}") from e
 
-    def save_file(self, file, session_id: str) -> dict:
+    def save_file(self, file, session_id: str, file_id: Optional[str] = None) -> dict:
         """Save a file to the session's temporary directory"""
         if not file:
             raise ValueError("No file provided")
@@ -66,7 +106,7 @@ class FileService:
             if not filename:
                 raise ValueError("Invalid filename")
                 
-            unique_filename = f"{uuid.uuid4()}_{filename}"
+            unique_filename = f"{file_id or uuid.uuid4()}_{filename}"
             session_dir = self.get_session_dir(session_id)
             file_path = os.path.join(session_dir, unique_filename)
             
@@ -109,11 +149,66 @@ class FileService:
                 if filename.startswith(file_id):
                     file_path = os.path.join(session_dir, filename)
                     os.remove(file_path)
+                    self.session_dirs[session_id]['files'].pop(file_id, None)
                     return True
             return False
         except Exception as e:
             raise RuntimeError(f"Failed to remove file: {str(e)}") from e
 
+    def _restore_session(self, session_id: str) -> bool:
+        """Re-register a session directory left on disk before a restart, if there is one"""
+        try:
+            # Session IDs are UUIDs; anything else could point outside the base directory
+            uuid.UUID(session_id)
+        except ValueError:
+            return False
+        session_dir = os.path.join(self.base_temp_dir, session_id)
+        if not os.path.isdir(session_dir):
+            return False
+        self.session_dirs[session_id] = {
+            'path': session_dir,
+            'created_at': datetime.fromtimestamp(os.path.getmtime(session_dir)),
+            'files': {}
+        }
+        return True
+
+    def get_file_record(self, session_id: str, file_id: str) -> dict:
+        """Look up a file in a session by its ID"""
+        if not session_id or not file_id:
+            raise ValueError("Session ID and file ID are required")
+        if session_id not in self.session_dirs and not self._restore_session(session_id):
+            raise ValueError(f"Session {session_id} not found")
+
+        files = self.session_dirs[session_id]['files']
+        if file_id not in files:
+            # Files saved before a restart are only known by their name prefix
+            session_dir = self.session_dirs[session_id]['path']
+            for filename in os.listdir(session_dir):
+                if filename.startswith(f"{file_id}_"):
+                    files[file_id] = {
+                        'path': os.path.join(session_dir, filename),
+                        'mime_type': None
+                    }
+                    break
+            else:
+                raise ValueError(f"File {file_id} not found in session")
+        return files[file_id]
+
+    def get_file_mime_type(self, session_id: str, file_id: str) -> str:
+        """Get the detected MIME type of a session file, memoized per file"""
+        record = self.get_file_record(session_id, file_id)
+        if record['mime_type'] is None:
+            record['mime_type'] = get_file_mime_type(record['path'])
+        return record['mime_type']
+
+    def get_file_text(self, session_id: str, file_id: str) -> Optional[str]:
+        """Get the extracted text of a session file, memoized per file"""
+        record = self.get_file_record(session_id, file_id)
+        if 'text' not in record:
+            mime_type = self.get_file_mime_type(session_id, file_id)
+            record['text'] = extract_file_text(record['path'], mime_type)
+        return record['text']
+
     def cleanup_session(self, session_id: str) -> bool:
         """Remove a session's temporary directory"""
         if session_id in self.session_dirs:
@@ -135,8 +230,9 @@ class FileService:
         files = []
         for filename in os.listdir(session_dir):
             file_path = os.path.join(session_dir, filename)
-            original_filename = filename.split('_', 1)[1]  # Remove UUID prefix
+            file_id, original_filename = filename.split('_', 1)  # Split off UUID prefix
             files.append({
+                'file_id': file_id,
                 'filename': original_filename,
                 'path': file_path,
                 'size': os.path.getsize(file_path),
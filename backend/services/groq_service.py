@@ -1,9 +1,13 @@
 import os
 import requests
 from dotenv import load_dotenv
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+import re
 from requests.exceptions import RequestException, Timeout
 import base64
+import json
+from services.image_cache import image_result_cache, image_key
+from services.image_encoding import decode_image, vision_image_encoder
 
 # Load environment variables from .env file
 load_dotenv()
@@ -60,6 +64,10 @@ class GroqService:
         }
     }
 
+    VISION_MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"
+    # Most images the vision model accepts in a single request
+    VISION_MAX_IMAGES = 5
+
     def __init__(self):
         self.api_key = os.environ.get('GROQ_API_KEY')
         if not self.api_key:
@@ -92,19 +100,45 @@ class GroqService:
             )
             response.raise_for_status()
             return response.json()
-        except Timeout as exc:
-            print("Request to Groq API timed out")
-            raise RuntimeError("Request timed out. Please try again.") from exc
         except RequestException as e:
-            print(f"Error calling Groq API: {str(e)}")
-            if isinstance(e, requests.exceptions.ConnectionError):
-                raise RuntimeError("Network connection error. Please check your internet connection.") from e
-            elif isinstance(e, requests.exceptions.HTTPError):
-                if e.response.status_code == 429:
-                    raise RuntimeError("Rate limit exceeded. Please try again later.") from e
-                elif e.response.status_code >= 500:
-                    raise RuntimeError("Groq API service error. Please try again later.") from e
-            raise RuntimeError(f"API request failed: {str(e)}") from e
+            raise self._request_error(e) from e
+
+    def _stream_request(self, endpoint: str, payload: Dict[str, Any], timeout: int = 30) -> Iterator[Dict[str, Any]]:
+        """Make a streaming request to Groq API, yielding each server-sent chunk as it arrives"""
+        try:
+            with self.session.post(
+                f"{self.base_url}/{endpoint}",
+                headers=self.headers,
+                json={**payload, "stream": True},
+                timeout=timeout,
+                stream=True
+            ) as response:
+                response.raise_for_status()
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data: "):
+                        continue
+                    data = line[len("data: "):]
+                    if data == "[DONE]":
+                        return
+                    yield json.loads(data)
+        except RequestException as e:
+            raise self._request_error(e) from e
+
+    @staticmethod
+    def _request_error(e: RequestException) -> RuntimeError:
+        """User-facing error for a failed Groq API request"""
+        if isinstance(e, Timeout):
+            print("Request to Groq API timed out")
+            return RuntimeError("Request timed out. Please try again.")
+        print(f"Error calling Groq API: {str(e)}")
+        if isinstance(e, requests.exceptions.ConnectionError):
+            return RuntimeError("Network connection error. Please check your internet connection.")
+        elif isinstance(e, requests.exceptions.HTTPError):
+            if e.response.status_code == 429:
+                return RuntimeError("Rate limit exceeded. Please try again later.")
+            elif e.response.status_code >= 500:
+                return RuntimeError("Groq API service error. Please try again later.")
+        return RuntimeError(f"API request failed: {str(e)}")
 
     def get_appropriate_model(self, task_type: str = None) -> str:
         """Get the most appropriate model for a given task"""
@@ -117,29 +151,32 @@ class GroqService:
         
         return "llama-3.3-70b-versatile"  # Fallback to default
 
+    def _completion_payload(self, prompt: str, task_type: str = None, specific_model: str = None, max_tokens: int = 1000) -> Dict[str, Any]:
+        model = specific_model if specific_model else self.get_appropriate_model(task_type)
+        messages = [
+            {
+                "role": "system",
+                "content": "You are a helpful educational AI assistant. When analyzing content, provide detailed, insightful responses that help users understand the material better. Break down complex topics, offer examples, and suggest related concepts to explore."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+        
+        return {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": 0.7
+        }
+
     def complete_prompt(self, prompt: str, task_type: str = None, specific_model: str = None, max_tokens: int = 1000) -> Dict[str, Any]:
         """Complete a prompt using the appropriate model"""
         try:
-            model = specific_model if specific_model else self.get_appropriate_model(task_type)
-            messages = [
-                {
-                    "role": "system",
-                    "content": "You are a helpful educational AI assistant. When analyzing content, provide detailed, insightful responses that help users understand the material better. Break down complex topics, offer examples, and suggest related concepts to explore."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-            
-            payload = {
-                "model": model,
-                "messages": messages,
-                "max_tokens": max_tokens,
-                "temperature": 0.7
-            }
+            payload = self._completion_payload(prompt, task_type, specific_model, max_tokens)
             
-            print(f"Calling Groq API with model: {model}")
+            print(f"Calling Groq API with model: {payload['model']}")
             # Use a longer timeout for content analysis
             return self._make_request("chat/completions", payload, timeout=60)
             
@@ -147,9 +184,24 @@ class GroqService:
             print(f"Error in complete_prompt: {str(e)}")
             raise RuntimeError(f"Failed to process request: {str(e)}") from e
 
-    def process_math_problem(self, problem_text: str, subject: str = "mathematics") -> Dict[str, Any]:
-        """Process a math problem with step-by-step analysis"""
-        prompt = f"""Analyze this {subject} problem step by step:
+    def stream_prompt(self, prompt: str, task_type: str = None, specific_model: str = None, max_tokens: int = 1000) -> Iterator[str]:
+        """Complete a prompt like complete_prompt, yielding the answer text piece by piece as it is generated"""
+        payload = self._completion_payload(prompt, task_type, specific_model, max_tokens)
+        print(f"Streaming from Groq API with model: {payload['model']}")
+        try:
+            # The timeout bounds the wait for each chunk, not the whole answer
+            for chunk in self._stream_request("chat/completions", payload, timeout=60):
+                choices = chunk.get("choices") or [{}]
+                content = choices[0].get("delta", {}).get("content")
+                if content:
+                    yield content
+        except Exception as e:
+            print(f"Error in stream_prompt: {str(e)}")
+            raise RuntimeError(f"Failed to process request: {str(e)}") from e
+
+    @staticmethod
+    def _math_problem_prompt(problem_text: str, subject: str) -> str:
+        return f"""Analyze this {subject} problem step by step:
         {problem_text}
         
         Please provide:
@@ -158,7 +210,14 @@ class GroqService:
         3. Similar practice problems
         4. Learning resources
         """
-        return self.complete_prompt(prompt, task_type='REASONING')
+
+    def process_math_problem(self, problem_text: str, subject: str = "mathematics") -> Dict[str, Any]:
+        """Process a math problem with step-by-step analysis"""
+        return self.complete_prompt(self._math_problem_prompt(problem_text, subject), task_type='REASONING')
+    
+    def stream_math_problem(self, problem_text: str, subject: str = "mathematics") -> Iterator[str]:
+        """Same analysis as process_math_problem, streamed as it is generated"""
+        return self.stream_prompt(self._math_problem_prompt(problem_text, subject), task_type='REASONING')
     
     def translate_content(self, content: str, target_language: str) -> Dict[str, Any]:
         """Translate content to target language"""
@@ -233,6 +292,137 @@ Content to analyze:
 
     def analyze_image(self, image_data, query: str = "What's in this image?", is_url: bool = False) -> Dict[str, Any]:
         """Analyze an image using Groq's vision model"""
+        if not is_url:
+            try:
+                image_bytes = base64.b64decode(image_data)
+            except Exception as e:
+                raise RuntimeError(f"Failed to analyze image: {str(e)}") from e
+            return self.analyze_image_bytes(image_bytes, query)
+        return self._analyze_image_url(image_data, query)
+
+    def analyze_image_bytes(self, image_bytes: bytes, query: str = "What's in this image?") -> Dict[str, Any]:
+        """Analyze encoded image bytes, shrinking and re-encoding them before upload"""
+        try:
+            # Decode once for both the cache lookup and the re-encode
+            image = decode_image(image_bytes)
+            
+            # Re-uploads of the same image reuse the earlier answer to the same query
+            cache_key = image_key(image)
+            cache_field = f"vision:{query}"
+            cached = image_result_cache.get(cache_key, cache_field)
+            if cached is not None:
+                return cached
+            
+            encoded = vision_image_encoder.encode(image, image_bytes)
+            print(f"Vision image {encoded['original_bytes']} -> {encoded['encoded_bytes']} bytes ({encoded['mime_type']})")
+            
+            result = self._analyze_image_url(f"data:{encoded['mime_type']};base64,{encoded['data']}", query)
+            image_result_cache.put(cache_key, cache_field, result)
+            return result
+            
+        except RuntimeError:
+            raise
+        except Exception as e:
+            print(f"Error in analyze_image: {str(e)}")
+            raise RuntimeError(f"Failed to analyze image: {str(e)}") from e
+
+    def analyze_images(self, images: List[bytes], query: str = "What's in this image?",
+                       labels: List[str] = None) -> List[str]:
+        """
+        Analyze several images with as few vision requests as possible, packing up to
+        VISION_MAX_IMAGES labelled images into each request. Returns one answer per image.
+        Images the model did not answer separately share its whole answer, which is given
+        once, to the first of them, while the others refer to it; only separate answers
+        are cached.
+        """
+        labels = labels or [f"Image {index}" for index in range(1, len(images) + 1)]
+        cache_field = f"vision_batch:{query}"
+        answers = [None] * len(images)
+        pending = []
+        try:
+            for index, image_bytes in enumerate(images):
+                image = decode_image(image_bytes)
+                cache_key = image_key(image)
+                answers[index] = image_result_cache.get(cache_key, cache_field)
+                if answers[index] is None:
+                    pending.append((index, cache_key, vision_image_encoder.encode(image, image_bytes)))
+        except Exception as e:
+            print(f"Error in analyze_images: {str(e)}")
+            raise RuntimeError(f"Failed to analyze images: {str(e)}") from e
+
+        for start in range(0, len(pending), self.VISION_MAX_IMAGES):
+            chunk = pending[start:start + self.VISION_MAX_IMAGES]
+            chunk_answers, combined = self._analyze_image_batch(
+                [encoded for _, _, encoded in chunk], [labels[index] for index, _, _ in chunk], query
+            )
+            combined_label = None
+            for (index, cache_key, _), answer in zip(chunk, chunk_answers):
+                if answer is not None:
+                    answers[index] = answer
+                    image_result_cache.put(cache_key, cache_field, answer)
+                elif combined_label is None:
+                    answers[index] = combined
+                    combined_label = labels[index]
+                else:
+                    answers[index] = f"See the answer for {combined_label}."
+        return answers
+
+    def _analyze_image_batch(self, encoded_images: List[Dict[str, Any]], labels: List[str],
+                             query: str) -> Tuple[List[Optional[str]], str]:
+        """
+        Send one vision request for several images. Returns the answer split per image,
+        with None for images the model did not answer separately, and the whole answer.
+        """
+        if len(encoded_images) == 1:
+            result = self._analyze_image_url(
+                f"data:{encoded_images[0]['mime_type']};base64,{encoded_images[0]['data']}", query
+            )
+            answer = result.get('choices', [{}])[0].get('message', {}).get('content', '')
+            return [answer], answer
+
+        content = [{
+            "type": "text",
+            "text": f"""{query}
+
+Answer separately for each of the {len(encoded_images)} images below. Start the answer for each
+image with a line of the form "### Image N" using its number, in order, and do not add other headings of that form."""
+        }]
+        for number, (encoded, label) in enumerate(zip(encoded_images, labels), 1):
+            content.append({"type": "text", "text": f"Image {number}: {label}"})
+            content.append({
+                "type": "image_url",
+                "image_url": {"url": f"data:{encoded['mime_type']};base64,{encoded['data']}"}
+            })
+
+        payload = {
+            "model": self.VISION_MODEL,
+            "messages": [{"role": "user", "content": content}],
+            "max_tokens": min(1024 * len(encoded_images), 4096),
+            "temperature": 0.7
+        }
+        try:
+            result = self._make_request("chat/completions", payload, timeout=120)
+        except Exception as e:
+            print(f"Error in analyze_images: {str(e)}")
+            raise RuntimeError(f"Failed to analyze images: {str(e)}") from e
+
+        answer = result.get('choices', [{}])[0].get('message', {}).get('content', '')
+        return self._split_image_answers(answer, len(encoded_images)), answer.strip()
+
+    @staticmethod
+    def _split_image_answers(answer: str, count: int) -> List[Optional[str]]:
+        """Split a combined answer on its "### Image N" headings, with None for images without one"""
+        sections = {}
+        matches = list(re.finditer(r'^#+\s*\**\s*Image\s+(\d+)\b.*$', answer, flags=re.MULTILINE | re.IGNORECASE))
+        for position, match in enumerate(matches):
+            end = matches[position + 1].start() if position + 1 < len(matches) else len(answer)
+            number = int(match.group(1))
+            if 1 <= number <= count and number not in sections:
+                sections[number] = answer[match.end():end].strip()
+        return [sections.get(number) or None for number in range(1, count + 1)]
+
+    def _analyze_image_url(self, image_url: str, query: str) -> Dict[str, Any]:
+        """Send an image URL or data URL to the vision model"""
         try:
             messages = [
                 {
@@ -245,7 +435,7 @@ Content to analyze:
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": image_data if is_url else f"data:image/jpeg;base64,{image_data}"
+                                "url": image_url
                             }
                         }
                     ]
@@ -253,7 +443,7 @@ Content to analyze:
             ]
             
             payload = {
-                "model": "meta-llama/llama-4-scout-17b-16e-instruct",  # Updated model name
+                "model": self.VISION_MODEL,
                 "messages": messages,
                 "max_tokens": 1024,
                 "temperature": 0.7
@@ -269,8 +459,8 @@ Content to analyze:
         """Analyze a local image file"""
         try:
             with open(image_path, "rb") as image_file:
-                base64_image = base64.b64encode(image_file.read()).decode('utf-8')
-            return self.analyze_image(base64_image, query, is_url=False)
+                image_bytes = image_file.read()
         except Exception as e:
             print(f"Error reading local image: {str(e)}")
-            raise RuntimeError(f"Failed to process local image: {str(e)}") from e
\ No newline at end of file
+            raise RuntimeError(f"Failed to process local image: {str(e)}") from e
+        return self.analyze_image_bytes(image_bytes, query)
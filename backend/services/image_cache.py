@@ -0,0 +1,151 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import Any, NamedTuple, Optional, Tuple
+import numpy as np
+from PIL import Image
+
+# DCT of a 64x64 thumbnail, keeping the 16x16 lowest frequencies: 256 bits
+HASH_THUMBNAIL = 64
+HASH_SIZE = 16
+HASH_WORDS = HASH_SIZE * HASH_SIZE // 64
+# Near-duplicates are confirmed on a grayscale thumbnail this many pixels square, fine
+# enough that a changed digit on a page still stands out from JPEG noise
+COMPARE_SIZE = 256
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """Orthonormal DCT-II basis, so a 2D DCT is two matrix products"""
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    basis = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    basis[0] /= np.sqrt(2)
+    return basis
+
+_DCT = _dct_matrix(HASH_THUMBNAIL)
+
+def phash(image: Image.Image) -> np.ndarray:
+    """
+    Perceptual hash of an image as an array of uint64 words.
+    Each bit records whether a low-frequency DCT coefficient of a grayscale thumbnail is
+    above the median, so recompression and rescaling barely change it.
+    """
+    # Let JPEG decoding skip most of the DCT work; the hash only needs a thumbnail
+    image.draft("L", (HASH_THUMBNAIL * 4, HASH_THUMBNAIL * 4))
+    thumbnail = image.convert("L").resize((HASH_THUMBNAIL, HASH_THUMBNAIL), Image.BILINEAR)
+    coefficients = (_DCT @ np.asarray(thumbnail, dtype=np.float64) @ _DCT.T)[:HASH_SIZE, :HASH_SIZE].ravel()
+    # The DC term only tracks brightness, so leave it out of the median
+    bits = coefficients > np.median(coefficients[1:])
+    return np.packbits(bits).view('>u8').astype(np.uint64)
+
+class ImageKey(NamedTuple):
+    """What the result cache knows about an image"""
+    digest: str             # sha256 of the decoded pixels, identical only for identical images
+    size: Tuple[int, int]
+    phash: np.ndarray       # perceptual hash, used to find near-duplicate candidates
+    thumbnail: np.ndarray   # grayscale pixels, used to confirm a candidate really is the same page
+
+def image_key(image: Image.Image) -> ImageKey:
+    """Exact digest, perceptual hash and comparison thumbnail of a decoded image"""
+    pixels = image.convert("RGB")
+    digest = hashlib.sha256(f"{pixels.width}x{pixels.height}".encode() + pixels.tobytes()).hexdigest()
+    thumbnail = np.asarray(pixels.convert("L").resize((COMPARE_SIZE, COMPARE_SIZE), Image.BOX), dtype=np.uint8)
+    return ImageKey(digest, pixels.size, phash(pixels), thumbnail.ravel())
+
+def image_key_bytes(image_bytes: bytes) -> Optional[ImageKey]:
+    """Key of encoded image bytes, or None if they cannot be decoded"""
+    try:
+        return image_key(Image.open(BytesIO(image_bytes)))
+    except Exception as e:
+        print(f"Could not hash image: {e}")
+        return None
+
+class PerceptualHashCache:
+    """
+    Bounded LRU cache of per-image results, keyed by an exact digest of the pixels.
+    An image whose digest is not cached may still match a re-encoded copy of a cached
+    one: the perceptual hash narrows the search to entries within max_distance bits, and
+    a candidate of the same dimensions is only used if no pixel of its grayscale
+    thumbnail differs by more than pixel_tolerance. The hash alone cannot be trusted,
+    since different pages that share a layout can hash only a few bits apart; rescaled
+    copies are not matched, as resampling blurs a page as much as editing a digit does.
+    """
+
+    def __init__(self, max_entries: int = None, max_distance: int = None, pixel_tolerance: int = None):
+        self.max_entries = max_entries or int(os.environ.get('IMAGE_CACHE_MAX_ENTRIES', 256))
+        self.max_distance = max_distance if max_distance is not None else int(os.environ.get('IMAGE_CACHE_MAX_DISTANCE', 16))
+        self.pixel_tolerance = pixel_tolerance if pixel_tolerance is not None else int(os.environ.get('IMAGE_CACHE_PIXEL_TOLERANCE', 16))
+        self._index = np.zeros((self.max_entries, HASH_WORDS), dtype=np.uint64)
+        self._sizes = np.zeros((self.max_entries, 2), dtype=np.int64)
+        self._thumbnails = np.zeros((self.max_entries, COMPARE_SIZE * COMPARE_SIZE), dtype=np.uint8)
+        self._occupied = np.zeros(self.max_entries, dtype=bool)
+        self._entries = OrderedDict()  # slot -> {field: value}, least recently used first
+        self._digests = {}  # digest -> slot, for every image stored in or matched to a slot
+        self._slot_digests = {}  # slot -> digests pointing at it, dropped on eviction
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _find_slot(self, key: ImageKey) -> Optional[int]:
+        """Slot holding this image, or a confirmed near-duplicate of it"""
+        slot = self._digests.get(key.digest)
+        if slot is not None or not self._entries:
+            return slot
+        differing = np.bitwise_xor(self._index, key.phash)
+        distances = np.unpackbits(differing.view(np.uint8), axis=1).sum(axis=1)
+        distances[~self._occupied | np.any(self._sizes != key.size, axis=1)] = HASH_WORDS * 64 + 1
+        candidates = np.flatnonzero(distances <= self.max_distance)
+        for candidate in candidates[np.argsort(distances[candidates], kind='stable')]:
+            difference = np.abs(self._thumbnails[candidate].astype(np.int16) - key.thumbnail.astype(np.int16))
+            if difference.max() <= self.pixel_tolerance:
+                return int(candidate)
+        return None
+
+    def get(self, key: Optional[ImageKey], field: str) -> Optional[Any]:
+        """Cached value of field for this image or a confirmed near-duplicate"""
+        if key is None:
+            return None
+        with self._lock:
+            slot = self._find_slot(key)
+            if slot is None or field not in self._entries[slot]:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(slot)
+            self.hits += 1
+            return self._entries[slot][field]
+
+    def put(self, key: Optional[ImageKey], field: str, value: Any) -> None:
+        """Store value under field for the image, sharing the entry of a confirmed near-duplicate"""
+        if key is None:
+            return
+        with self._lock:
+            slot = self._find_slot(key)
+            if slot is None:
+                if len(self._entries) >= self.max_entries:
+                    slot, _ = self._entries.popitem(last=False)
+                    for digest in self._slot_digests.pop(slot, ()):
+                        del self._digests[digest]
+                else:
+                    slot = int(np.argmin(self._occupied))
+                self._index[slot] = key.phash
+                self._sizes[slot] = key.size
+                self._thumbnails[slot] = key.thumbnail
+                self._occupied[slot] = True
+                self._entries[slot] = {}
+            if key.digest not in self._digests:
+                self._digests[key.digest] = slot
+                self._slot_digests.setdefault(slot, []).append(key.digest)
+            self._entries[slot][field] = value
+            self._entries.move_to_end(slot)
+
+    def clear(self) -> None:
+        """Drop every cached result"""
+        with self._lock:
+            self._occupied[:] = False
+            self._entries.clear()
+            self._digests.clear()
+            self._slot_digests.clear()
+
+# Shared by the OCR and vision paths so one upload's key serves both
+image_result_cache = PerceptualHashCache()
@@ -0,0 +1,101 @@
+import os
+import base64
+import threading
+from io import BytesIO
+from typing import Any, Dict
+from PIL import Image
+
+# Formats the vision endpoint accepts as-is, by PIL format name
+VISION_MIME_TYPES = {
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'WEBP': 'image/webp',
+}
+
+def decode_image(image_bytes: bytes) -> Image.Image:
+    """Fully decode encoded image bytes once, keeping the source format"""
+    image = Image.open(BytesIO(image_bytes))
+    image.load()
+    return image
+
+class VisionImageEncoder:
+    """
+    Shrinks images to the resolution the vision model actually uses and re-encodes them
+    compactly before they are base64'd into a request, tracking the bytes saved.
+    """
+
+    # PNG is kept for few-color images while at most this many times the JPEG size
+    PNG_SIZE_ALLOWANCE = 1.5
+
+    def __init__(self, max_side: int = None, jpeg_quality: int = None, max_palette_colors: int = 4096):
+        self.max_side = max_side or int(os.environ.get('VISION_MAX_SIDE', 1280))
+        self.jpeg_quality = jpeg_quality or int(os.environ.get('VISION_JPEG_QUALITY', 85))
+        # Screenshots and diagrams have few colors and stay sharper (and often smaller) as PNG
+        self.max_palette_colors = max_palette_colors
+        self._lock = threading.Lock()
+        self.images = 0
+        self.original_bytes = 0
+        self.encoded_bytes = 0
+
+    def encode(self, image: Image.Image, original_bytes: bytes) -> Dict[str, Any]:
+        """Return base64 data and its MIME type for a decoded image"""
+        source_format = image.format
+        resized = image.width > self.max_side or image.height > self.max_side
+
+        if resized:
+            # Only the first frame of an animated GIF is analyzed anyway
+            image = image.copy()
+            image.thumbnail((self.max_side, self.max_side), Image.LANCZOS)
+
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        if has_alpha:
+            # The model sees transparent areas as black; flatten onto white like a page
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            rgba = image.convert('RGBA')
+            background.paste(rgba, mask=rgba.getchannel('A'))
+            image = background
+        elif image.mode != 'L':
+            image = image.convert('RGB')
+
+        buffered = BytesIO()
+        image.save(buffered, format='JPEG', quality=self.jpeg_quality, optimize=True)
+        encoded = buffered.getvalue()
+        mime_type = 'image/jpeg'
+
+        if image.getcolors(self.max_palette_colors) is not None:
+            # Prefer lossless PNG for text-heavy images unless it costs much more than JPEG
+            buffered = BytesIO()
+            image.save(buffered, format='PNG')
+            if buffered.tell() <= len(encoded) * self.PNG_SIZE_ALLOWANCE:
+                encoded = buffered.getvalue()
+                mime_type = 'image/png'
+
+        # Keep the upload as-is when it is already small and in a supported format
+        if not resized and source_format in VISION_MIME_TYPES and len(original_bytes) <= len(encoded):
+            encoded = original_bytes
+            mime_type = VISION_MIME_TYPES[source_format]
+
+        with self._lock:
+            self.images += 1
+            self.original_bytes += len(original_bytes)
+            self.encoded_bytes += len(encoded)
+
+        return {
+            'data': base64.b64encode(encoded).decode('utf-8'),
+            'mime_type': mime_type,
+            'original_bytes': len(original_bytes),
+            'encoded_bytes': len(encoded)
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Totals of bytes received and sent since startup"""
+        with self._lock:
+            return {
+                'images': self.images,
+                'original_bytes': self.original_bytes,
+                'encoded_bytes': self.encoded_bytes,
+                'bytes_saved': self.original_bytes - self.encoded_bytes
+            }
+
+# Shared so the byte savings cover every vision call in the process
+vision_image_encoder = VisionImageEncoder()
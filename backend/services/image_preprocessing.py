@@ -0,0 +1,220 @@
+import time
+from typing import Dict, List, Tuple
+import numpy as np
+from PIL import Image
+
+# Longest side that still gives tesseract ~300 DPI on a letter/A4 page
+OCR_MAX_SIDE = 2480
+# Sauvola window and sensitivity; k is lower than the textbook 0.5 to keep faint pencil strokes
+THRESHOLD_WINDOW = 31
+THRESHOLD_K = 0.2
+THRESHOLD_R = 128.0
+THRESHOLD_STATS_SCALE = 4
+# Skew search range and step in degrees
+DESKEW_MAX_ANGLE = 10.0
+DESKEW_STEP = 0.5
+DESKEW_SAMPLE_POINTS = 20000
+BORDER_MARGIN = 10
+# Text regions are separated by blank bands this many text line heights wide
+REGION_ROW_GAP_LINES = 2.0
+REGION_COL_GAP_LINES = 3.0
+REGION_MIN_SIDE = 12
+REGION_MAX_DEPTH = 8
+
+def downscale(image: Image.Image, max_side: int = OCR_MAX_SIDE) -> Image.Image:
+    """Shrink the image so its longest side is at most max_side"""
+    scale = max_side / max(image.size)
+    if scale >= 1:
+        return image
+    # reduce() is a cheap integer box filter; finish with an exact resize
+    factor = int(1 / scale)
+    if factor > 1:
+        image = image.reduce(factor)
+    size = (max(1, round(image.width * max_side / max(image.size))),
+            max(1, round(image.height * max_side / max(image.size))))
+    return image.resize(size, Image.BILINEAR) if size != image.size else image
+
+def to_grayscale_array(image: Image.Image) -> np.ndarray:
+    """Convert an image to a float32 grayscale array"""
+    return np.asarray(image.convert("L"), dtype=np.float32)
+
+def _window_sum(integral: np.ndarray, window: int, shape: Tuple[int, int]) -> np.ndarray:
+    """Sum over a window centred on every pixel using an integral image with a leading zero row/column"""
+    height, width = shape
+    half = window // 2
+    # Edge padding clamps window bounds to the image so every corner lookup is a plain slice
+    padded = np.pad(integral, half, mode='edge')
+    return (padded[window:window + height, window:window + width] - padded[:height, window:window + width]
+            - padded[window:window + height, :width] + padded[:height, :width])
+
+def _window_area(window: int, shape: Tuple[int, int]) -> np.ndarray:
+    """Number of pixels covered by each pixel's window, accounting for edges"""
+    height, width = shape
+    half = window // 2
+    rows = np.arange(height)
+    cols = np.arange(width)
+    row_counts = np.minimum(rows + half + 1, height) - np.maximum(rows - half, 0)
+    col_counts = np.minimum(cols + half + 1, width) - np.maximum(cols - half, 0)
+    return np.outer(row_counts, col_counts).astype(np.float64)
+
+def adaptive_threshold(gray: np.ndarray, window: int = THRESHOLD_WINDOW, k: float = THRESHOLD_K,
+                       r: float = THRESHOLD_R, stats_scale: int = THRESHOLD_STATS_SCALE) -> np.ndarray:
+    """
+    Sauvola binarization: True where a pixel is ink.
+    Local mean and deviation come from integral images, so cost is independent of window size.
+    They vary slowly, so they are computed on a grid stats_scale times coarser and expanded back.
+    """
+    height, width = gray.shape
+    grid_height, grid_width = -(-height // stats_scale), -(-width // stats_scale)
+    values = np.pad(gray, ((0, grid_height * stats_scale - height), (0, grid_width * stats_scale - width)),
+                    mode='edge').astype(np.float64)
+    blocks = (grid_height, stats_scale, grid_width, stats_scale)
+    block_mean = values.reshape(blocks).mean(axis=(1, 3))
+    block_mean_sq = (values * values).reshape(blocks).mean(axis=(1, 3))
+
+    grid = (grid_height, grid_width)
+    grid_window = max(3, (window // stats_scale) | 1)
+    integral = np.zeros((grid_height + 1, grid_width + 1))
+    integral[1:, 1:] = block_mean.cumsum(0).cumsum(1)
+    integral_sq = np.zeros_like(integral)
+    integral_sq[1:, 1:] = block_mean_sq.cumsum(0).cumsum(1)
+
+    area = _window_area(grid_window, grid)
+    mean = _window_sum(integral, grid_window, grid) / area
+    variance = _window_sum(integral_sq, grid_window, grid) / area - mean * mean
+    std = np.sqrt(np.maximum(variance, 0))
+    threshold = (mean * (1 + k * (std / r - 1))).astype(np.float32)
+    threshold = np.repeat(np.repeat(threshold, stats_scale, axis=0), stats_scale, axis=1)[:height, :width]
+    return gray < threshold
+
+def estimate_skew(ink: np.ndarray, max_angle: float = DESKEW_MAX_ANGLE, step: float = DESKEW_STEP) -> float:
+    """
+    Estimate text skew in degrees by maximizing the sharpness of the horizontal
+    projection profile of ink pixels over candidate angles
+    """
+    ys, xs = np.nonzero(ink)
+    if len(ys) < 100:
+        return 0.0
+    if len(ys) > DESKEW_SAMPLE_POINTS:
+        picks = np.random.default_rng(0).choice(len(ys), DESKEW_SAMPLE_POINTS, replace=False)
+        ys, xs = ys[picks], xs[picks]
+
+    angles = np.arange(-max_angle, max_angle + step / 2, step)
+    radians = np.deg2rad(angles)
+    # Rotated row coordinate of every sampled pixel at every angle: (angles, points)
+    projected = np.outer(np.cos(radians), ys) - np.outer(np.sin(radians), xs)
+    projected = np.rint(projected - projected.min(axis=1, keepdims=True)).astype(np.int64)
+    bins = int(projected.max()) + 1
+    offsets = (np.arange(len(angles)) * bins)[:, None]
+    profiles = np.bincount((projected + offsets).ravel(), minlength=len(angles) * bins)
+    profiles = profiles.reshape(len(angles), bins).astype(np.float64)
+    # Aligned text lines concentrate ink in few rows, which maximizes the sum of squares
+    scores = (profiles * profiles).sum(axis=1)
+    return float(angles[int(np.argmax(scores))])
+
+def crop_borders(ink: np.ndarray, margin: int = BORDER_MARGIN) -> Tuple[slice, slice]:
+    """Bounding box of the ink plus a margin, ignoring thin edge artefacts"""
+    rows = np.flatnonzero(ink.sum(axis=1) > max(2, ink.shape[1] // 500))
+    cols = np.flatnonzero(ink.sum(axis=0) > max(2, ink.shape[0] // 500))
+    if len(rows) == 0 or len(cols) == 0:
+        return slice(None), slice(None)
+    return (slice(max(rows[0] - margin, 0), rows[-1] + margin + 1),
+            slice(max(cols[0] - margin, 0), cols[-1] + margin + 1))
+
+def _ink_segments(profile: np.ndarray, min_gap: int) -> List[Tuple[int, int]]:
+    """Runs of a projection profile that contain ink, merging runs separated by less than min_gap"""
+    ink_positions = np.flatnonzero(profile)
+    if len(ink_positions) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(ink_positions) > min_gap)
+    starts = np.concatenate(([ink_positions[0]], ink_positions[breaks + 1]))
+    ends = np.concatenate((ink_positions[breaks], [ink_positions[-1]])) + 1
+    return list(zip(starts.tolist(), ends.tolist()))
+
+def _largest_gap(segments: List[Tuple[int, int]]) -> int:
+    """Widest blank band between consecutive segments"""
+    return max((segments[i + 1][0] - segments[i][1] for i in range(len(segments) - 1)), default=0)
+
+def find_text_regions(ink: np.ndarray, row_gap: int = None, col_gap: int = None,
+                      min_side: int = REGION_MIN_SIDE) -> List[Tuple[int, int, int, int]]:
+    """
+    Split a binarized page into text regions with a recursive XY-cut on projection profiles.
+    Returns (top, bottom, left, right) boxes in reading order: blocks separated by a
+    horizontal blank band come top to bottom, columns separated by a vertical band left to right.
+    Blank areas and specks smaller than min_side are dropped.
+    """
+    height, width = ink.shape
+    # Scale the gaps to the handwriting or font size: the median height of ink row runs
+    lines = _ink_segments(ink.sum(axis=1) > 1, 1)
+    line_height = float(np.median([end - start for start, end in lines])) if lines else 20.0
+    row_gap = row_gap or max(10, int(line_height * REGION_ROW_GAP_LINES))
+    col_gap = col_gap or max(15, int(line_height * REGION_COL_GAP_LINES))
+    regions = []
+
+    def cut(top, bottom, left, right, depth):
+        block = ink[top:bottom, left:right]
+        # Ignore rows/columns with a pixel or two of noise
+        rows = _ink_segments(block.sum(axis=1) > 1, row_gap)
+        cols = _ink_segments(block.sum(axis=0) > 1, col_gap)
+        if not rows or not cols:
+            return
+
+        if depth < REGION_MAX_DEPTH and (len(rows) > 1 or len(cols) > 1):
+            # Cut along whichever axis has the widest blank band, relative to the required gap
+            if _largest_gap(rows) / row_gap >= _largest_gap(cols) / col_gap:
+                for start, end in rows:
+                    cut(top + start, top + end, left, right, depth + 1)
+            else:
+                for start, end in cols:
+                    cut(top, bottom, left + start, left + end, depth + 1)
+            return
+
+        box = (top + rows[0][0], top + rows[-1][1], left + cols[0][0], left + cols[-1][1])
+        if box[1] - box[0] >= min_side and box[3] - box[2] >= min_side:
+            regions.append(box)
+
+    cut(0, height, 0, width, 0)
+    return regions
+
+class PreprocessingPipeline:
+    """Vectorized OCR preprocessing: downscale, binarize, deskew and crop borders"""
+
+    def __init__(self, max_side: int = OCR_MAX_SIDE, window: int = THRESHOLD_WINDOW, k: float = THRESHOLD_K,
+                 deskew: bool = True, crop: bool = True):
+        self.max_side = max_side
+        self.window = window
+        self.k = k
+        self.deskew = deskew
+        self.crop = crop
+
+    def run(self, image: Image.Image) -> Tuple[Image.Image, Dict[str, float]]:
+        """Preprocess an image, returning the binarized result and per-step timings in seconds"""
+        timings = {}
+
+        start = time.perf_counter()
+        image = downscale(image, self.max_side)
+        gray = to_grayscale_array(image)
+        timings['downscale'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        ink = adaptive_threshold(gray, self.window, self.k)
+        timings['threshold'] = time.perf_counter() - start
+
+        if self.deskew:
+            start = time.perf_counter()
+            angle = estimate_skew(ink)
+            if angle:
+                rotated = Image.fromarray(ink).rotate(angle, resample=Image.NEAREST, expand=True, fillcolor=0)
+                ink = np.asarray(rotated, dtype=bool)
+            timings['deskew'] = time.perf_counter() - start
+
+        if self.crop:
+            start = time.perf_counter()
+            rows, cols = crop_borders(ink)
+            ink = ink[rows, cols]
+            timings['crop'] = time.perf_counter() - start
+
+        # Tesseract expects dark text on a light background
+        result = Image.fromarray(np.where(ink, 0, 255).astype(np.uint8))
+        timings['total'] = sum(timings.values())
+        return result, timings
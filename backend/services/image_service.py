@@ -1,19 +1,60 @@
 import os
 import tempfile
-from typing import Optional
+from io import BytesIO
+from typing import List, Optional
 from werkzeug.datastructures import FileStorage
 from PIL import Image, ImageEnhance, ImageFilter
+from services.ocr_engine import OCREngine
+from services.image_preprocessing import PreprocessingPipeline
+from services.image_cache import image_result_cache, image_key_bytes
+
+preprocessing_pipeline = PreprocessingPipeline()
+
+def preprocess_for_ocr(image: Image.Image) -> Image.Image:
+    """
+    Preprocess the image for better OCR results using the vectorized pipeline
+    """
+    try:
+        image, _ = preprocessing_pipeline.run(image)
+        return image
+    except Exception as e:
+        print(f"Error in preprocessing pipeline, falling back to basic preprocessing: {e}")
+        return basic_preprocess_for_ocr(image)
+
+def basic_preprocess_for_ocr(image: Image.Image) -> Image.Image:
+    """
+    Grayscale, fixed contrast boost and median filter at full resolution
+    """
+    try:
+        # Convert to grayscale
+        image = image.convert("L")
+        
+        # Enhance contrast
+        enhancer = ImageEnhance.Contrast(image)
+        image = enhancer.enhance(2.0)
+        
+        # Apply a slight blur to reduce noise
+        image = image.filter(ImageFilter.MedianFilter())
+        
+        return image
+    except Exception as e:
+        print(f"Error preprocessing image: {e}")
+        return image  # Return original image if preprocessing fails
+
+# Shared by every ImageService so the process has a single OCR pool
+ocr_engine = OCREngine(preprocess=preprocess_for_ocr)
 
 class ImageService:
     """Service for processing images, especially for math problems"""
     
+    # Images above this many pixels (e.g. whiteboard photos) are OCR'd region by region
+    TILED_OCR_MIN_PIXELS = int(os.environ.get('OCR_TILED_MIN_PIXELS', 4_000_000))
+    
     def __init__(self):
-        self.tesseract_available = False
-        try:
-            import pytesseract
-            self.pytesseract = pytesseract
-            self.tesseract_available = True
-        except ImportError:
+        self.ocr_engine = ocr_engine
+        self.result_cache = image_result_cache
+        self.tesseract_available = ocr_engine.available
+        if not self.tesseract_available:
             print("Tesseract OCR not available. Text extraction from images will be limited.")
     
     def extract_text_from_image(self, image_file: FileStorage) -> str:
@@ -28,27 +69,59 @@ class ImageService:
             return ""
         
         try:
-            # Save the file temporarily
-            temp_dir = tempfile.gettempdir()
-            temp_path = os.path.join(temp_dir, image_file.filename)
-            image_file.save(temp_path)
+            image_bytes = image_file.read()
             
-            # Open and preprocess the image
-            image = Image.open(temp_path)
-            image = self._preprocess_image(image)
+            # Re-submitted photos of the same page skip tesseract entirely
+            cache_key = image_key_bytes(image_bytes)
+            cached_text = self.result_cache.get(cache_key, 'ocr')
+            if cached_text is not None:
+                return cached_text
             
-            # Perform OCR using Tesseract
-            text = self.pytesseract.image_to_string(image)
+            # Preprocessing and OCR run in the engine's worker processes
+            if self._is_large_image(image_bytes):
+                text = self.ocr_engine.extract_text_tiled(image_bytes)
+            else:
+                text = self.ocr_engine.extract_text(image_bytes)
             
-            # Cleanup
-            os.remove(temp_path)
-            
-            return text.strip() if text else "No text was detected in the image."
+            text = text.strip() if text else "No text was detected in the image."
+            self.result_cache.put(cache_key, 'ocr', text)
+            return text
             
         except Exception as e:
             print(f"Error processing image: {e}")
             return f"Error processing image: {str(e)}"
     
+    def extract_text_from_images(self, image_files: List[FileStorage]) -> List[str]:
+        """
+        Extract text from several images in parallel, in input order
+        """
+        if not self.tesseract_available:
+            return ["Image text extraction is not available. Please install Tesseract OCR to enable this feature."] * len(image_files)
+        
+        try:
+            images = [image_file.read() for image_file in image_files]
+            keys = [image_key_bytes(image_bytes) for image_bytes in images]
+            texts = [self.result_cache.get(cache_key, 'ocr') for cache_key in keys]
+            
+            # Only OCR the images that are not already cached
+            missing = [index for index, text in enumerate(texts) if text is None]
+            extracted = self.ocr_engine.extract_text_batch([images[index] for index in missing])
+            for index, text in zip(missing, extracted):
+                texts[index] = text.strip() if text else "No text was detected in the image."
+                self.result_cache.put(keys[index], 'ocr', texts[index])
+            return texts
+        except Exception as e:
+            print(f"Error processing images: {e}")
+            return [f"Error processing image: {str(e)}"] * len(image_files)
+    
+    def _is_large_image(self, image_bytes: bytes) -> bool:
+        """Check the image dimensions from its header without decoding the pixels"""
+        try:
+            width, height = Image.open(BytesIO(image_bytes)).size
+        except Exception:
+            return False
+        return width * height >= self.TILED_OCR_MIN_PIXELS
+    
     def extract_math_expression(self, image_file: FileStorage) -> str:
         """
         Specialized function to extract math expressions from images
@@ -94,18 +167,4 @@ class ImageService:
         """
         Preprocess the image for better OCR results
         """
-        try:
-            # Convert to grayscale
-            image = image.convert("L")
-            
-            # Enhance contrast
-            enhancer = ImageEnhance.Contrast(image)
-            image = enhancer.enhance(2.0)
-            
-            # Apply a slight blur to reduce noise
-            image = image.filter(ImageFilter.MedianFilter())
-            
-            return image
-        except Exception as e:
-            print(f"Error preprocessing image: {e}")
-            return image  # Return original image if preprocessing fails
\ No newline at end of file
+        return preprocess_for_ocr(image)
\ No newline at end of file
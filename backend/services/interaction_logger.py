@@ -0,0 +1,202 @@
+import os
+import json
+import queue
+import atexit
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+
+def current_user_id() -> Optional[int]:
+    """Id of the user the request's JWT token belongs to, or None for anonymous requests"""
+    try:
+        identity = get_jwt_identity()
+    except RuntimeError:
+        # Routes without @jwt_required() still know the user when the client sent a token
+        try:
+            verify_jwt_in_request(optional=True)
+            identity = get_jwt_identity()
+        except Exception:
+            return None
+    return int(identity) if identity is not None else None
+
+def response_text(response: Any) -> str:
+    """Answer text from a Groq completion, or any other result, as a string"""
+    if isinstance(response, str):
+        return response
+    if isinstance(response, dict) and response.get('choices'):
+        return response['choices'][0].get('message', {}).get('content', '') or ''
+    return json.dumps(response, default=str)
+
+class InteractionLogger:
+    """
+    Records tutoring interactions without making requests wait for the database.
+    log() only puts a row on a bounded queue; a background thread takes up to batch_size
+    rows at a time and writes them with a single multi-row insert and commit. Rows are
+    filed under the user's open Session for the subject, started on first use. When the
+    queue is full, new rows are dropped and counted rather than slowing requests down.
+    Queued rows are written before the process exits.
+    """
+
+    def __init__(self, max_queue: int = None, batch_size: int = None, flush_interval: float = None):
+        self.max_queue = max_queue or int(os.environ.get('INTERACTION_LOG_QUEUE_SIZE', 10000))
+        self.batch_size = batch_size or int(os.environ.get('INTERACTION_LOG_BATCH_SIZE', 200))
+        self.flush_interval = flush_interval or float(os.environ.get('INTERACTION_LOG_FLUSH_INTERVAL', 1.0))
+        self.enabled = os.environ.get('INTERACTION_LOGGING', '1') != '0'
+        self.app = None
+        self.logged = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._sessions = OrderedDict()  # (user id, subject) -> session id, least recently used first
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app) -> None:
+        """Write to app's database and start the writer thread"""
+        self.app = app
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop_event.clear()
+                self._thread = threading.Thread(target=self._run, name='interaction-logger', daemon=True)
+                self._thread.start()
+                atexit.register(self.shutdown)
+
+    def log(self, query_type: str, query_content: Any, response: Any, subject: str = 'general',
+            user_id: Optional[int] = None) -> bool:
+        """
+        Queue an interaction of the current user, or of user_id when given.
+        Returns False when it was not queued: logging is off, the request is anonymous,
+        or the queue is full.
+        """
+        if not self.enabled or self.app is None:
+            return False
+        if user_id is None:
+            user_id = current_user_id()
+            if user_id is None:
+                return False
+        record = {
+            'user_id': user_id,
+            'subject': (subject or 'general')[:50],
+            'query_type': query_type[:20],
+            'query_content': query_content if isinstance(query_content, str) else json.dumps(query_content, default=str),
+            'response': response_text(response),
+            'timestamp': datetime.utcnow()
+        }
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.logged += 1
+        return True
+
+    def _next_batch(self, timeout: float) -> List[Dict[str, Any]]:
+        """Wait up to timeout for a first row, then take whatever else is queued, up to batch_size"""
+        try:
+            batch = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            batch = self._next_batch(self.flush_interval)
+            if batch:
+                self._write(batch)
+
+    def _session_id(self, user_id: int, subject: str) -> int:
+        """The user's open session for subject, started if there is none"""
+        from models import db
+        from models.session import Session
+
+        key = (user_id, subject)
+        if key in self._sessions:
+            self._sessions.move_to_end(key)
+            return self._sessions[key]
+
+        session = Session.query.filter_by(user_id=user_id, subject=subject, end_time=None) \
+            .order_by(Session.start_time.desc()).first()
+        if session is None:
+            session = Session(user_id=user_id, subject=subject)
+            db.session.add(session)
+            db.session.flush()
+        self._sessions[key] = session.id
+        while len(self._sessions) > 1024:
+            self._sessions.popitem(last=False)
+        return session.id
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        from models import db
+        from models.session import Interaction
+
+        try:
+            with self.app.app_context():
+                try:
+                    rows = [{
+                        'session_id': self._session_id(record['user_id'], record['subject']),
+                        'query_type': record['query_type'],
+                        'query_content': record['query_content'],
+                        'response': record['response'],
+                        'timestamp': record['timestamp']
+                    } for record in batch]
+                    db.session.execute(Interaction.__table__.insert(), rows)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    # A cached session may have been deleted; look them up again next time
+                    self._sessions.clear()
+                    raise
+        except Exception as e:
+            print(f"Failed to write {len(batch)} interactions: {e}")
+            with self._lock:
+                self.failed += len(batch)
+        else:
+            with self._lock:
+                self.written += len(batch)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """Block until every queued interaction has been written or has failed"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def shutdown(self) -> None:
+        """Stop the writer thread after writing everything still queued"""
+        self._stop_event.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=self.flush_interval + 5)
+        self._thread = None
+        # Rows queued after the thread's last batch
+        while True:
+            batch = self._next_batch(0)
+            if not batch:
+                break
+            self._write(batch)
+
+    def stats(self) -> Dict[str, int]:
+        """Interactions queued, written, dropped and failed since startup"""
+        with self._lock:
+            return {
+                'logged': self.logged,
+                'written': self.written,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'queued': self._queue.qsize()
+            }
+
+# Shared so every blueprint logs through the same queue and writer thread
+interaction_logger = InteractionLogger()
@@ -0,0 +1,150 @@
+import os
+import math
+import time
+import threading
+import atexit
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+from PIL import Image
+from services.image_preprocessing import find_text_regions
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+# How often a waiting caller checks whether its queued task has started
+QUEUE_POLL_INTERVAL = 0.05
+
+def _ocr_task(image_bytes: bytes, preprocess: Optional[Callable], config: str, timeout: float) -> str:
+    """Decode, preprocess and OCR one image inside a worker process"""
+    image = Image.open(BytesIO(image_bytes))
+    if preprocess:
+        image = preprocess(image)
+    # Passing the timeout to pytesseract kills the tesseract subprocess when it overruns
+    return pytesseract.image_to_string(image, config=config, timeout=timeout)
+
+def _layout_task(image_bytes: bytes, preprocess: Optional[Callable]) -> Tuple[np.ndarray, list]:
+    """Preprocess a page inside a worker and find its text regions"""
+    image = Image.open(BytesIO(image_bytes))
+    if preprocess:
+        image = preprocess(image)
+    page = np.asarray(image.convert("L"))
+    return page, find_text_regions(page < 128)
+
+def _ocr_region_task(region: np.ndarray, config: str, timeout: float) -> str:
+    """OCR an already preprocessed region inside a worker process"""
+    return pytesseract.image_to_string(Image.fromarray(region), config=config, timeout=timeout)
+
+class OCREngine:
+    """Runs tesseract OCR in a dedicated process pool sized to the CPU count"""
+
+    def __init__(self, preprocess: Optional[Callable] = None, workers: int = None,
+                 max_pending: int = None, task_timeout: float = None, queue_timeout: float = None):
+        """
+        preprocess must be a module-level function so it can be pickled into the workers.
+        At most max_pending tasks may be queued or running; further submissions wait
+        up to queue_timeout seconds for a slot before being rejected.
+        """
+        self.preprocess = preprocess
+        self.workers = workers or int(os.environ.get('OCR_WORKERS', 0)) or os.cpu_count() or 1
+        self.max_pending = max_pending or int(os.environ.get('OCR_MAX_PENDING', self.workers * 4))
+        self.task_timeout = task_timeout or float(os.environ.get('OCR_TASK_TIMEOUT', 30))
+        self.queue_timeout = queue_timeout if queue_timeout is not None else float(os.environ.get('OCR_QUEUE_TIMEOUT', 10))
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        """Check if tesseract can be used"""
+        return pytesseract is not None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Create the process pool on first use so workers fork from a fully initialized app"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                atexit.register(self.shutdown)
+            return self._executor
+
+    def _submit(self, fn: Callable, *args):
+        """Queue a task on the pool, waiting for a free slot"""
+        if not self.available:
+            raise RuntimeError("Tesseract OCR is not available")
+
+        # Backpressure: block while the pool is saturated instead of queueing without bound
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise RuntimeError("OCR engine is busy. Please try again shortly.")
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def submit(self, image_bytes: bytes, config: str = ''):
+        """Queue one image for OCR and return its future"""
+        return self._submit(_ocr_task, image_bytes, self.preprocess, config, self.task_timeout)
+
+    def _result(self, future) -> str:
+        """
+        Wait for an OCR future. The deadline starts once the task leaves the queue, so
+        time spent behind other tasks never counts against it; the queue itself is bounded
+        by max_pending tasks of at most task_timeout each, spread over the workers.
+        """
+        queued_until = time.monotonic() + self.task_timeout * math.ceil(self.max_pending / self.workers)
+        deadline = None
+        while True:
+            if deadline is None and (future.running() or time.monotonic() >= queued_until):
+                # The pool marks a task running when it hands it to the call queue, which
+                # holds one task beyond the busy workers, so allow for one task ahead of it
+                deadline = time.monotonic() + self.task_timeout * 2
+            timeout = QUEUE_POLL_INTERVAL if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                return future.result(timeout=timeout)
+            except FutureTimeoutError as exc:
+                if deadline is not None and time.monotonic() >= deadline:
+                    future.cancel()
+                    raise RuntimeError("OCR timed out") from exc
+
+    def extract_text(self, image_bytes: bytes, config: str = '') -> str:
+        """OCR a single image"""
+        return self._result(self.submit(image_bytes, config))
+
+    def extract_text_batch(self, images: List[bytes], config: str = '') -> List[str]:
+        """OCR several images in parallel, returning text in input order"""
+        futures = [self.submit(image_bytes, config) for image_bytes in images]
+        return [self._result(future) for future in futures]
+
+    def extract_text_regions(self, page: np.ndarray, regions: List[Tuple[int, int, int, int]],
+                             config: str = '--psm 6', margin: int = 10) -> List[str]:
+        """OCR (top, bottom, left, right) regions of a preprocessed page in parallel, in input order"""
+        height, width = page.shape
+        futures = []
+        for top, bottom, left, right in regions:
+            # Keep a white margin around each region; tesseract misreads glyphs touching the edge
+            region = page[max(top - margin, 0):min(bottom + margin, height),
+                          max(left - margin, 0):min(right + margin, width)]
+            futures.append(self._submit(_ocr_region_task, region, config, self.task_timeout))
+        return [self._result(future).strip() for future in futures]
+
+    def extract_text_tiled(self, image_bytes: bytes, config: str = '--psm 6', margin: int = 10) -> str:
+        """
+        OCR a large image region by region: one worker finds the text regions, then each
+        region is OCR'd in parallel and the text is joined in reading order.
+        Blank areas are never sent to tesseract.
+        """
+        page, regions = self._result(self._submit(_layout_task, image_bytes, self.preprocess))
+        texts = self.extract_text_regions(page, regions, config, margin)
+        return "\n\n".join(text for text in texts if text)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker processes"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
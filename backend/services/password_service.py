@@ -0,0 +1,67 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when too many password hashes are already queued"""
+
+class PasswordHasher:
+    """
+    Hashes and checks passwords on a small dedicated thread pool. PBKDF2 is deliberately
+    slow; running it on request threads lets a burst of logins take every core. Here at most
+    `workers` hashes run at once (hashlib releases the GIL while hashing, so other requests
+    keep running) and at most `max_pending` wait, beyond which callers get PasswordHasherBusy
+    instead of queueing without bound.
+
+    The cost is PASSWORD_HASH_ITERATIONS PBKDF2-SHA256 rounds. Stored hashes record their own
+    parameters, so hashes made with other settings still verify and are replaced on the next
+    successful login.
+    """
+
+    def __init__(self, iterations: int = None, workers: int = None, max_pending: int = None):
+        self.iterations = iterations or int(os.environ.get('PASSWORD_HASH_ITERATIONS', DEFAULT_PBKDF2_ITERATIONS))
+        self.method = f'pbkdf2:sha256:{self.iterations}'
+        self.workers = workers or int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+        self.max_pending = max_pending or int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 64))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_pending)
+
+    def _run(self, function, *args):
+        """Run function on the hashing pool and wait for its result"""
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy("Too many sign-in attempts at once. Please try again shortly.")
+        try:
+            return self._executor.submit(function, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        """Hash a password with the configured cost"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Whether a stored hash was made with different parameters than the configured ones"""
+        return password_hash.split('$', 1)[0] != self.method
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        """Check a password against a stored hash"""
+        return self._run(check_password_hash, password_hash, password)
+
+    def _verify_and_update(self, password_hash: str, password: str) -> Tuple[bool, Optional[str]]:
+        if not check_password_hash(password_hash, password):
+            return False, None
+        if self.needs_rehash(password_hash):
+            return True, generate_password_hash(password, self.method)
+        return True, None
+
+    def verify_and_update(self, password_hash: str, password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Check a password, and when it is correct but the stored hash uses old parameters,
+        also return a new hash to store; otherwise the new hash is None
+        """
+        return self._run(self._verify_and_update, password_hash, password)
+
+# Shared so the bound covers every request in the process
+password_hasher = PasswordHasher()
@@ -0,0 +1,108 @@
+import os
+import re
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import numpy as np
+
+# Words per shingle when fingerprinting text; 3 keeps word order significant
+SHINGLE_SIZE = 3
+
+def _normalize_text(text: str) -> str:
+    """Collapse whitespace and case so re-flowed or re-extracted text hashes the same"""
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+def text_simhash(text: str) -> np.uint64:
+    """
+    64-bit SimHash of a text's word shingles.
+    Texts that differ in a few words differ in only a few bits.
+    """
+    words = _normalize_text(text).split(' ')
+    shingles = [' '.join(words[i:i + SHINGLE_SIZE]) for i in range(max(1, len(words) - SHINGLE_SIZE + 1))]
+    hashes = np.array([int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), 'big')
+                       for s in shingles], dtype=np.uint64)
+    bits = np.unpackbits(hashes.astype('>u8').view(np.uint8).reshape(-1, 8), axis=1)
+    # Each shingle votes on every bit; the fingerprint keeps the majority
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+    return np.packbits(votes > 0).view('>u8').astype(np.uint64)[0]
+
+def _hamming(a: np.ndarray, b: np.ndarray) -> int:
+    return int(np.unpackbits(np.bitwise_xor(np.atleast_1d(a), np.atleast_1d(b)).view(np.uint8)).sum())
+
+class ScreenAnalysisCache:
+    """
+    Remembers the last screen analysis per session with fingerprints of what was analysed,
+    so repeated requests for an unchanged screen reuse it instead of calling the LLM again.
+    A screen matches when its frame pHash or its text SimHash is within the configured
+    distance; analyses expire after max_age seconds regardless.
+    """
+
+    def __init__(self, max_sessions: int = 256, max_age: float = None,
+                 image_distance: int = None, text_distance: int = None):
+        self.max_sessions = max_sessions
+        self.max_age = max_age or float(os.environ.get('SCREEN_ANALYSIS_MAX_AGE', 300))
+        # Stricter than upload matching: a few lines of new work on screen should count as a change
+        self.image_distance = image_distance if image_distance is not None else int(os.environ.get('SCREEN_ANALYSIS_IMAGE_DISTANCE', 8))
+        self.text_distance = text_distance if text_distance is not None else int(os.environ.get('SCREEN_ANALYSIS_TEXT_DISTANCE', 1))
+        self._entries = OrderedDict()  # session id -> last analysis, least recently used first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _matches(self, entry: Dict[str, Any], image_hash: Optional[np.ndarray], text: Optional[str]) -> bool:
+        if image_hash is not None and entry['image_hash'] is not None:
+            if _hamming(image_hash, entry['image_hash']) <= self.image_distance:
+                return True
+        if text and entry['text_digest'] is not None:
+            if hashlib.sha1(_normalize_text(text).encode()).hexdigest() == entry['text_digest']:
+                return True
+            return _hamming(text_simhash(text), entry['text_simhash']) <= self.text_distance
+        return False
+
+    def lookup(self, session_id: str, subject: str, image_hash: np.ndarray = None,
+               text: str = None) -> Optional[Dict[str, Any]]:
+        """Last analysis for the session if the screen has not materially changed since"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if (entry is None or entry['subject'] != subject
+                    or time.time() - entry['timestamp'] > self.max_age
+                    or not self._matches(entry, image_hash, text)):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+            return entry
+
+    def store(self, session_id: str, subject: str, content: str, analysis: str,
+              image_hash: np.ndarray = None) -> None:
+        """Record an analysis and the fingerprints of the screen it describes"""
+        entry = {
+            'subject': subject,
+            'content': content,
+            'analysis': analysis,
+            'image_hash': image_hash,
+            'text_digest': hashlib.sha1(_normalize_text(content).encode()).hexdigest() if content else None,
+            'text_simhash': text_simhash(content) if content else None,
+            'timestamp': time.time()
+        }
+        with self._lock:
+            self._entries[session_id] = entry
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_sessions:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, session_id: str) -> None:
+        """Forget a session's last analysis"""
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit and miss counts since startup"""
+        with self._lock:
+            return {
+                'sessions': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses
+            }
@@ -0,0 +1,132 @@
+import base64
+import json
+import struct
+import time
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from PIL import Image
+
+TILE_SIZE = 64
+# Send a full frame at least this often so clients can recover from a missed delta
+KEYFRAME_INTERVAL = 30
+# Past this fraction of changed tiles a keyframe is cheaper than a delta
+KEYFRAME_CHANGE_RATIO = 0.5
+
+def png_bytes(image: Image.Image) -> bytes:
+    """PNG-encode an image region"""
+    buffered = BytesIO()
+    image.save(buffered, format="PNG")
+    return buffered.getvalue()
+
+def encode_png(image: Image.Image) -> str:
+    """PNG-encode an image region as base64"""
+    return base64.b64encode(png_bytes(image)).decode()
+
+def pack_binary_message(result: Dict[str, Any]) -> bytes:
+    """
+    Pack an encoder result whose images are raw PNG bytes into one binary message:
+    a big-endian uint32 header length, a uint32 payload length, the JSON header, then
+    the concatenated PNGs. Each image in the header is replaced by its offset and length
+    in the payload.
+    """
+    header = dict(result)
+    payload = BytesIO()
+
+    def place(image: bytes) -> Dict[str, int]:
+        offset = payload.tell()
+        payload.write(image)
+        return {"offset": offset, "length": len(image)}
+
+    if "image" in header:
+        header["image"] = place(header["image"])
+    if "tiles" in header:
+        header["tiles"] = [dict(tile, image=place(tile["image"])) for tile in header["tiles"]]
+
+    header_bytes = json.dumps(header).encode()
+    payload_bytes = payload.getvalue()
+    return struct.pack(">II", len(header_bytes), len(payload_bytes)) + header_bytes + payload_bytes
+
+def changed_tiles(previous: np.ndarray, current: np.ndarray, tile_size: int = TILE_SIZE) -> np.ndarray:
+    """Boolean grid marking every tile_size square that differs between two frames"""
+    height, width = current.shape[:2]
+    channels = current.shape[2] if current.ndim == 3 else 1
+    rows, cols = -(-height // tile_size), -(-width // tile_size)
+    # Treat each row as a flat run of channel bytes; reducing over a 3-wide channel axis is slow
+    changed = (previous != current).reshape(height, width * channels)
+    if rows * tile_size != height or cols * tile_size != width:
+        changed = np.pad(changed, ((0, rows * tile_size - height), (0, (cols * tile_size - width) * channels)))
+    band_changed = changed.reshape(rows, tile_size, cols * tile_size * channels).any(axis=1)
+    return band_changed.reshape(rows, cols, tile_size * channels).any(axis=2)
+
+def tile_runs(grid: np.ndarray) -> List[Tuple[int, int, int]]:
+    """Horizontal runs of changed tiles as (row, first column, column count)"""
+    runs = []
+    for row in np.flatnonzero(grid.any(axis=1)):
+        cols = np.flatnonzero(grid[row])
+        breaks = np.flatnonzero(np.diff(cols) > 1)
+        starts = np.concatenate(([cols[0]], cols[breaks + 1]))
+        ends = np.concatenate((cols[breaks], [cols[-1]])) + 1
+        runs.extend((int(row), int(start), int(end - start)) for start, end in zip(starts, ends))
+    return runs
+
+class ScreenDeltaEncoder:
+    """
+    Encodes successive screen frames for one client as keyframes, changed-tile
+    deltas or "unchanged", keeping the last frame the client was sent
+    """
+
+    def __init__(self, tile_size: int = TILE_SIZE, keyframe_interval: Optional[int] = KEYFRAME_INTERVAL):
+        """keyframe_interval=None disables periodic keyframes, e.g. for lossless streams"""
+        self.tile_size = tile_size
+        self.keyframe_interval = keyframe_interval
+        self.previous = None
+        self.sequence = 0
+        self.frames_since_keyframe = 0
+
+    def encode(self, screenshot: Image.Image, force_keyframe: bool = False, raw: bool = False) -> Dict[str, Any]:
+        """Encode a frame relative to the previous one; raw keeps images as PNG bytes instead of base64"""
+        encode_image = png_bytes if raw else encode_png
+        if screenshot.mode != "RGB":
+            screenshot = screenshot.convert("RGB")
+        current = np.asarray(screenshot)
+        self.sequence += 1
+        result = {
+            "sequence": self.sequence,
+            "width": current.shape[1],
+            "height": current.shape[0],
+            "timestamp": time.time(),
+            "status": "success"
+        }
+
+        keyframe = (force_keyframe or self.previous is None or self.previous.shape != current.shape
+                    or (self.keyframe_interval and self.frames_since_keyframe + 1 >= self.keyframe_interval))
+        if not keyframe:
+            grid = changed_tiles(self.previous, current, self.tile_size)
+            if not grid.any():
+                self.frames_since_keyframe += 1
+                result["type"] = "unchanged"
+                return result
+            keyframe = grid.mean() > KEYFRAME_CHANGE_RATIO
+
+        self.previous = current
+        if keyframe:
+            self.frames_since_keyframe = 0
+            result.update({"type": "keyframe", "image": encode_image(screenshot)})
+            return result
+
+        self.frames_since_keyframe += 1
+        tiles = []
+        for row, col, count in tile_runs(grid):
+            left, top = col * self.tile_size, row * self.tile_size
+            right = min(left + count * self.tile_size, result["width"])
+            bottom = min(top + self.tile_size, result["height"])
+            tiles.append({
+                "x": left,
+                "y": top,
+                "width": right - left,
+                "height": bottom - top,
+                "image": encode_image(screenshot.crop((left, top, right, bottom)))
+            })
+        result.update({"type": "delta", "tile_size": self.tile_size, "tiles": tiles})
+        return result
@@ -0,0 +1,68 @@
+from io import BytesIO
+from typing import Any, Dict, Tuple
+from PIL import Image, features
+
+# Named encoder settings for screen captures, from lossless to smallest.
+# compress_level applies to PNG (0-9), quality to JPEG/WebP, scale shrinks both sides.
+SCREEN_PROFILES = {
+    'png': {'format': 'PNG', 'compress_level': 6},
+    'png_fast': {'format': 'PNG', 'compress_level': 1},
+    'jpeg': {'format': 'JPEG', 'quality': 80},
+    'webp': {'format': 'WEBP', 'quality': 75},
+    'jpeg_half': {'format': 'JPEG', 'quality': 80, 'scale': 0.5},
+    # Code and documents read fine without colour, and gray PNG is a third the size
+    'text': {'format': 'PNG', 'compress_level': 1, 'grayscale': True},
+}
+DEFAULT_PROFILE = 'png'
+
+MIME_TYPES = {
+    'PNG': 'image/png',
+    'JPEG': 'image/jpeg',
+    'WEBP': 'image/webp',
+}
+
+def resolve_profile(name: str = None, overrides: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Look up a named profile and apply per-request overrides"""
+    name = name or DEFAULT_PROFILE
+    if name not in SCREEN_PROFILES:
+        raise ValueError(f"Unknown screen encoding profile: {name}")
+    profile = dict(SCREEN_PROFILES[name])
+    for key, value in (overrides or {}).items():
+        if value is not None:
+            profile[key] = value
+
+    profile['format'] = profile['format'].upper()
+    if profile['format'] == 'JPG':
+        profile['format'] = 'JPEG'
+    if profile['format'] not in MIME_TYPES:
+        raise ValueError(f"Unsupported screen encoding format: {profile['format']}")
+    if profile['format'] == 'WEBP' and not features.check('webp'):
+        raise ValueError("WebP encoding is not available in this Pillow build")
+    if not 0 < profile.get('scale', 1.0) <= 1.0:
+        raise ValueError("Scale must be between 0 and 1")
+    return profile
+
+def profile_key(profile: Dict[str, Any]) -> Tuple:
+    """Hashable identity of a resolved profile, for caching encodings"""
+    return tuple(sorted(profile.items()))
+
+def encode_screen(image: Image.Image, profile: Dict[str, Any]) -> Tuple[bytes, str]:
+    """Encode a screenshot with a resolved profile, returning the bytes and MIME type"""
+    scale = profile.get('scale', 1.0)
+    if scale < 1.0:
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                             Image.BILINEAR)
+    if profile.get('grayscale'):
+        image = image.convert('L')
+    elif image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    buffered = BytesIO()
+    if profile['format'] == 'PNG':
+        image.save(buffered, format='PNG', compress_level=int(profile.get('compress_level', 6)))
+    elif profile['format'] == 'WEBP':
+        # method 0 is the fastest WebP encoder; the default (4) is several times slower
+        image.save(buffered, format='WEBP', quality=int(profile.get('quality', 75)), method=0)
+    else:
+        image.save(buffered, format='JPEG', quality=int(profile.get('quality', 80)))
+    return buffered.getvalue(), MIME_TYPES[profile['format']]
@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+from PIL import ImageGrab
+
+class ScreenCaptureScheduler:
+    """
+    Captures the screen on a background thread into a bounded ring buffer.
+    The interval drops to min_interval while the screen is changing and backs off
+    towards max_interval while it is idle, so a static screen costs almost nothing.
+    """
+
+    def __init__(self, grab: Callable = None, min_interval: float = None, max_interval: float = None,
+                 buffer_size: int = None, backoff: float = 1.5):
+        self.grab = grab or ImageGrab.grab
+        self.min_interval = min_interval or float(os.environ.get('SCREEN_MIN_INTERVAL', 0.25))
+        self.max_interval = max_interval or float(os.environ.get('SCREEN_MAX_INTERVAL', 5.0))
+        self.backoff = backoff
+        self.frames = deque(maxlen=buffer_size or int(os.environ.get('SCREEN_BUFFER_SIZE', 10)))
+        self.interval = self.min_interval
+        self.sequence = 0
+        self._previous_pixels = None
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def is_running(self) -> bool:
+        """Check if the capture thread is alive"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the capture thread if it is not already running"""
+        with self._lock:
+            if self.is_running:
+                return
+            self._stop_event.clear()
+            self.interval = self.min_interval
+            self._thread = threading.Thread(target=self._run, name='screen-capture', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the capture thread and wait for it to exit"""
+        self._stop_event.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=self.max_interval + 1)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.capture_once()
+            except Exception as e:
+                print(f"Background screen capture failed: {e}")
+                self.interval = self.max_interval
+            # Event.wait sleeps without polling and wakes immediately on stop()
+            self._stop_event.wait(self.interval)
+
+    def capture_once(self) -> Dict[str, Any]:
+        """Grab one frame, record it and adapt the capture interval"""
+        screenshot = self.grab()
+        pixels = np.asarray(screenshot)
+        changed = self._previous_pixels is None or not np.array_equal(pixels, self._previous_pixels)
+        self._previous_pixels = pixels
+
+        if changed:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+
+        with self._lock:
+            self.sequence += 1
+            frame = {
+                "image": screenshot,
+                "timestamp": time.time(),
+                "sequence": self.sequence,
+                "changed": changed,
+                "lock": threading.Lock(),
+                "encoded": {}  # Encodings are computed once and shared by every reader
+            }
+            self.frames.append(frame)
+            self._new_frame.notify_all()
+        return frame
+
+    def latest(self, max_age: float = None) -> Optional[Dict[str, Any]]:
+        """Most recent frame, or None if there is none or it is older than max_age seconds"""
+        with self._lock:
+            if not self.frames:
+                return None
+            frame = self.frames[-1]
+        if max_age is not None and time.time() - frame["timestamp"] > max_age:
+            return None
+        return frame
+
+    def wait_for_frame(self, after_sequence: int = 0, timeout: float = None) -> Optional[Dict[str, Any]]:
+        """
+        Block until a frame newer than after_sequence exists and return the newest one.
+        Readers that fall behind skip straight to the latest frame instead of queueing.
+        """
+        with self._new_frame:
+            self._new_frame.wait_for(lambda: self.frames and self.frames[-1]["sequence"] > after_sequence,
+                                     timeout=timeout)
+            if self.frames and self.frames[-1]["sequence"] > after_sequence:
+                return self.frames[-1]
+            return None
+
+    def recent(self, count: int = None) -> List[Dict[str, Any]]:
+        """Up to count most recent frames, oldest first"""
+        with self._lock:
+            frames = list(self.frames)
+        return frames[-count:] if count else frames
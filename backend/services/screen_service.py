@@ -1,5 +1,5 @@
 try:
-    from desktop_use import DesktopUseClient, Locator, ApiError, sleep, ElementResponse
+    from desktop_use import DesktopUseClient, Locator, ApiError, sleep
     DESKTOP_USE_AVAILABLE = True
 except ImportError:
     DESKTOP_USE_AVAILABLE = False
@@ -7,46 +7,189 @@ except ImportError:
 
 from PIL import ImageGrab
 import base64
-from io import BytesIO
 import time
-from typing import Dict, Any, Optional
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterator, Optional
+from services.screen_delta import ScreenDeltaEncoder
+from services.screen_monitor import ScreenCaptureScheduler
+from services.screen_encoding import encode_screen, profile_key, resolve_profile
+from services.screen_analysis import ScreenAnalysisCache
+from services.image_cache import phash
+from services.image_service import ocr_engine
+from services.screen_text import ScreenTextModel
+from services.app_watcher import ApplicationWatcher
+from services.window_text import WindowTextExtractor
+
+def _make_locator(selector_chain):
+    return Locator(selector_chain=selector_chain)
 
 class ScreenService:
-    def __init__(self, base_url: str = '127.0.0.1:3000'):
-        """Initialize the screen monitoring service using Terminator"""
+    def __init__(self, base_url: str = '127.0.0.1:3000', client=None, locator_factory=None):
+        """
+        Initialize the screen monitoring service using Terminator.
+        client replaces the DesktopUseClient and locator_factory the desktop_use Locator,
+        e.g. with fakes in tests.
+        """
         self._connected = False
-        if DESKTOP_USE_AVAILABLE:
+        self.client = client
+        if client is not None:
+            self._connected = True
+        elif DESKTOP_USE_AVAILABLE:
             try:
                 self.client = DesktopUseClient(base_url=base_url)
                 self._connected = True
             except Exception as e:
                 print(f"Could not connect to Terminator server: {e}")
         self.is_monitoring = False
+        self.monitor = ScreenCaptureScheduler()
+        # Each delta client needs its own previous frame; keep only the most recent few
+        self.max_delta_clients = 8
+        self._delta_encoders = OrderedDict()  # client id -> (encoder, lock), least recently used first
+        self._delta_lock = threading.Lock()
+        self.analysis_cache = ScreenAnalysisCache()
+        self.text_model = ScreenTextModel(ocr_engine)
+        # One watcher per application, shared by every client following it
+        self._app_watchers = {}
+        self._watchers_ready = {}  # application -> event set once its watcher has opened or failed
+        self._watchers_lock = threading.Lock()
+        self.window_text = WindowTextExtractor(self.client, locator_factory or _make_locator)
     
     @property
     def is_connected(self) -> bool:
         """Check if connected to Terminator server"""
         return self._connected and DESKTOP_USE_AVAILABLE
     
-    def capture_screen_content(self) -> Dict[str, Any]:
-        """Capture current screen content/state"""
+    def _current_frame(self) -> Dict[str, Any]:
+        """Latest monitored frame when monitoring, otherwise a fresh capture"""
+        if self.monitor.is_running:
+            # A frame is never older than the idle interval, plus slack for a slow grab
+            frame = self.monitor.latest(max_age=self.monitor.max_interval * 2)
+            if frame is not None:
+                return frame
+        return {
+            "image": ImageGrab.grab(),
+            "timestamp": time.time(),
+            "sequence": None,
+            "lock": threading.Lock(),
+            "encoded": {}
+        }
+    
+    def _encode_frame(self, frame: Dict[str, Any], profile: Dict[str, Any]) -> Dict[str, str]:
+        """Encode a frame as base64 once per profile, however many clients read it"""
+        key = profile_key(profile)
+        with frame["lock"]:
+            if key not in frame["encoded"]:
+                data, mime_type = encode_screen(frame["image"], profile)
+                frame["encoded"][key] = {
+                    "image": base64.b64encode(data).decode(),
+                    "mime_type": mime_type
+                }
+            return frame["encoded"][key]
+    
+    def capture_screen_content(self, profile: str = None, **overrides) -> Dict[str, Any]:
+        """
+        Capture current screen content/state.
+        profile names an encoder profile (see SCREEN_PROFILES); overrides such as
+        format, quality, compress_level, scale or grayscale adjust it per request.
+        """
+        try:
+            encoder_profile = resolve_profile(profile, overrides)
+        except ValueError as e:
+            return {"error": str(e)}
+        
         try:
             # Capture the screen
-            screenshot = ImageGrab.grab()
+            frame = self._current_frame()
             
             # Convert to base64 for transmission
-            buffered = BytesIO()
-            screenshot.save(buffered, format="PNG")
-            img_str = base64.b64encode(buffered.getvalue()).decode()
+            encoded = self._encode_frame(frame, encoder_profile)
             
             return {
-                "image": img_str,
-                "timestamp": time.time(),
+                "image": encoded["image"],
+                "mime_type": encoded["mime_type"],
+                "timestamp": frame["timestamp"],
+                "sequence": frame["sequence"],
                 "status": "success"
             }
         except Exception as e:
             return {"error": f"Screenshot failed: {str(e)}"}
     
+    def capture_screen_delta(self, client_id: str = 'default', force_keyframe: bool = False) -> Dict[str, Any]:
+        """Capture the screen and return only the tiles that changed since this client's last frame"""
+        try:
+            screenshot = self._current_frame()["image"]
+        except Exception as e:
+            return {"error": f"Screenshot failed: {str(e)}"}
+        
+        # The registry lock only covers the lookup, so clients diff and encode in parallel;
+        # each encoder has its own lock for its previous frame
+        with self._delta_lock:
+            entry = self._delta_encoders.pop(client_id, None) or (ScreenDeltaEncoder(), threading.Lock())
+            self._delta_encoders[client_id] = entry
+            while len(self._delta_encoders) > self.max_delta_clients:
+                self._delta_encoders.popitem(last=False)
+        
+        encoder, lock = entry
+        with lock:
+            try:
+                return encoder.encode(screenshot, force_keyframe)
+            except Exception as e:
+                return {"error": f"Screen encoding failed: {str(e)}"}
+    
+    def stream_frames(self, raw: bool = True, keepalive: float = 15.0) -> Iterator[Optional[Dict[str, Any]]]:
+        """
+        Yield tile deltas for one streaming client as the capture loop produces frames.
+        A slow client only ever gets the newest frame, so stale frames are dropped rather
+        than queued. Yields None after keepalive idle seconds so dead connections are noticed.
+        """
+        if not self.monitor.is_running:
+            self.start_monitoring()
+        
+        # The stream is ordered and lossless, so keyframes are only needed on size changes
+        encoder = ScreenDeltaEncoder(keyframe_interval=None)
+        last_sequence = 0
+        while self.monitor.is_running:
+            frame = self.monitor.wait_for_frame(last_sequence, timeout=keepalive)
+            if frame is None:
+                yield None
+                continue
+            last_sequence = frame["sequence"]
+            
+            result = encoder.encode(frame["image"], raw=raw)
+            if result["type"] != "unchanged":
+                yield result
+    
+    def capture_for_analysis(self) -> Dict[str, Any]:
+        """Capture the screen with a perceptual hash of the frame for analysis caching"""
+        try:
+            frame = self._current_frame()
+            with frame["lock"]:
+                # Hashed once per frame, however many sessions analyse it
+                if "phash" not in frame:
+                    frame["phash"] = phash(frame["image"])
+            return {
+                "frame": frame,
+                "image_hash": frame["phash"],
+                "timestamp": frame["timestamp"]
+            }
+        except Exception as e:
+            return {"error": f"Screenshot failed: {str(e)}"}
+    
+    def extract_screen_text(self, frame: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Text on screen via local OCR, re-reading only the regions that changed since
+        the last frame this service read
+        """
+        if not ocr_engine.available:
+            return {"error": "Screen text extraction requires Tesseract OCR"}
+        try:
+            result = self.text_model.update(frame["image"], frame["sequence"])
+            result["status"] = "success"
+            return result
+        except Exception as e:
+            return {"error": f"Screen text extraction failed: {str(e)}"}
+    
     def analyze_screen(self, image_data: str = None) -> Dict[str, Any]:
         """Analyze screen content"""
         if not image_data:
@@ -80,22 +223,94 @@ class ScreenService:
     
     def _extract_text_from_window(self, window_info: Dict[str, Any]) -> str:
         """Extract text content from the specified window"""
-        if not DESKTOP_USE_AVAILABLE:
-            return ""
+        return self.extract_window_text(window_info).get("text", "")
+    
+    def extract_window_text(self, window_info: Dict[str, Any], full_scan: bool = False) -> Dict[str, Any]:
+        """
+        Text content of a window with the changes since the last extraction.
+        Element labels are cached per window, so frequent sampling mostly re-reads
+        only the elements that have been changing.
+        """
+        if self.client is None:
+            return {"text": "", "error": "Desktop use functionality not available"}
             
         try:
-            window_locator = Locator(selector_chain=f'window:{window_info["id"]}')
-            text_elements = self.client.find_elements(window_locator)
-            
-            extracted_text = []
-            for element in text_elements:
-                if isinstance(element, ElementResponse) and element.label:
-                    extracted_text.append(element.label)
-            
-            return "\n".join(extracted_text)
+            return self.window_text.extract(str(window_info["id"]), full_scan=full_scan)
         except Exception as e:
             print(f"Error extracting text from window: {e}")
-            return ""
+            self.window_text.forget(str(window_info["id"]))
+            return {"text": "", "error": str(e)}
+    
+    def watch_application(self, app_name: str) -> ApplicationWatcher:
+        """
+        Start watching an application, opening it first, or return its running watcher.
+        Opening can take seconds, so it happens outside the registry lock; callers asking
+        for an application that is still opening wait on its ready event instead.
+        """
+        key = app_name.lower()
+        with self._watchers_lock:
+            watcher = self._app_watchers.get(key)
+            if watcher is None:
+                watcher = ApplicationWatcher(self.client, app_name)
+                self._app_watchers[key] = watcher
+            ready = self._watchers_ready.get(key)
+            opening = ready is None and not watcher.is_running
+            if opening:
+                ready = self._watchers_ready[key] = threading.Event()
+        
+        if not opening:
+            if ready is not None:
+                ready.wait()
+                if not watcher.is_running:
+                    raise RuntimeError(f"Could not start watching {app_name}")
+            return watcher
+        
+        try:
+            # Open the application if it's not already open
+            watcher.open()
+            watcher.poll_once()
+            watcher.start()
+        except Exception:
+            with self._watchers_lock:
+                if self._app_watchers.get(key) is watcher:
+                    del self._app_watchers[key]
+            raise
+        finally:
+            with self._watchers_lock:
+                self._watchers_ready.pop(key, None)
+                stopped = self._app_watchers.get(key) is not watcher
+            ready.set()
+        if stopped:
+            # stop_watching ran while the application was opening
+            watcher.stop()
+        return watcher
+    
+    def stop_watching(self, app_name: str) -> Dict[str, Any]:
+        """Stop watching an application"""
+        with self._watchers_lock:
+            watcher = self._app_watchers.pop(app_name.lower(), None)
+        if watcher is None:
+            return {"error": f"{app_name} is not being watched", "status": "failed"}
+        watcher.stop()
+        return {"application": app_name, "status": "stopped"}
+    
+    def application_events(self, app_name: str, keepalive: float = 15.0) -> Iterator[Optional[Dict[str, Any]]]:
+        """
+        Yield change events for a watched application as they happen, starting with its
+        current values. Yields None after keepalive idle seconds so dead connections are noticed.
+        """
+        watcher = self.watch_application(app_name)
+        snapshot = watcher.snapshot()
+        yield snapshot
+        # Not watcher.sequence: a change made while the snapshot was being sent must still be yielded
+        last_sequence = snapshot["sequence"]
+        while watcher.is_running:
+            events = watcher.wait_for_event(last_sequence, timeout=keepalive)
+            if not events:
+                yield None
+                continue
+            last_sequence = events[-1]["sequence"]
+            yield from events
     
     def monitor_math_application(self, app_name: str = "Calculator") -> Dict[str, Any]:
         """Specifically monitor math applications like calculator"""
@@ -106,32 +321,36 @@ class ScreenService:
             return {"error": "Not connected to Terminator server", "status": "failed"}
         
         try:
-            # Open the application if it's not already open
-            self.client.open_application(app_name)
-            time.sleep(1)  # Give time for app to open
+            # Keeps watching in the background; later calls read the cached values
+            watcher = self.watch_application(app_name)
+            snapshot = watcher.snapshot()
             
             # For calculator, we could get the display value
             if app_name.lower() == "calculator":
-                calc_window = self.client.locator(f'window:{app_name}')
-                display = calc_window.locator('name:CalculatorResults')
-                result = display.get_text()
-                
                 return {
                     "application": app_name,
-                    "current_value": result.text if hasattr(result, 'text') else "Unknown",
+                    "current_value": snapshot["values"].get("current_value") or "Unknown",
+                    "sequence": snapshot["sequence"],
                     "timestamp": time.time(),
                     "status": "success"
                 }
             
-            return {"application": app_name, "status": "monitoring"}
+            return {"application": app_name, "values": snapshot["values"], "status": "monitoring"}
             
         except Exception as e:
             return {"error": str(e), "status": "failed"}
     
     def start_monitoring(self):
+        self.monitor.start()
         self.is_monitoring = True
         return {"status": "success", "message": "Screen monitoring started"}
 
     def stop_monitoring(self):
+        self.monitor.stop()
+        with self._watchers_lock:
+            watchers = list(self._app_watchers.values())
+            self._app_watchers.clear()
+        for watcher in watchers:
+            watcher.stop()
         self.is_monitoring = False
         return {"status": "success", "message": "Screen monitoring stopped"}
\ No newline at end of file
@@ -0,0 +1,192 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+import numpy as np
+from PIL import Image
+from services.image_preprocessing import adaptive_threshold, find_text_regions
+from services.screen_delta import changed_tiles, tile_runs
+
+# Granularity of change detection; matches the delta encoder so a frame is diffed the same way
+SCREEN_TILE_SIZE = 64
+# Screen text is rendered crisply, so a few blank pixel rows reliably separate lines;
+# line-sized regions mean an edit re-OCRs a line rather than the whole window
+SCREEN_LINE_GAP = 3
+# UI text can be under the 12px minimum used for photographed pages
+SCREEN_MIN_REGION_SIDE = 6
+# Region texts remembered by pixel content, so scrolled or re-opened content is not OCR'd again
+REGION_CACHE_SIZE = 512
+
+Box = Tuple[int, int, int, int]  # (top, bottom, left, right) in pixels
+
+def normalize_polarity(gray: np.ndarray, tile_size: int = SCREEN_TILE_SIZE) -> np.ndarray:
+    """
+    Invert dark-background tiles so text is always dark on light.
+    Screens mix dark editors and terminals with light documents, and Sauvola
+    binarization only finds dark ink.
+    """
+    height, width = gray.shape
+    rows, cols = -(-height // tile_size), -(-width // tile_size)
+    padded = np.pad(gray, ((0, rows * tile_size - height), (0, cols * tile_size - width)), mode='edge')
+    # The median is the background colour whenever text covers less than half of a tile
+    tiles = padded.reshape(rows, tile_size, cols, tile_size).transpose(0, 2, 1, 3).reshape(rows, cols, -1)
+    dark = np.median(tiles, axis=2) < 128
+    dark = np.repeat(np.repeat(dark, tile_size, axis=0), tile_size, axis=1)[:height, :width]
+    return np.where(dark, 255 - gray, gray)
+
+def binarize_screen(gray: np.ndarray) -> np.ndarray:
+    """Black-on-white uint8 page of a grayscale screen area, ready for tesseract"""
+    ink = adaptive_threshold(normalize_polarity(gray).astype(np.float32))
+    return np.where(ink, 0, 255).astype(np.uint8)
+
+def _region_digest(region: np.ndarray) -> bytes:
+    """Identity of a region's pixels, wherever it is on screen"""
+    digest = hashlib.blake2b(np.ascontiguousarray(region).tobytes(), digest_size=16)
+    digest.update(str(region.shape).encode())
+    return digest.digest()
+
+def _overlaps(a: Box, b: Box) -> bool:
+    return a[0] < b[1] and b[0] < a[1] and a[2] < b[3] and b[2] < a[3]
+
+def _touches(a: Box, b: Box) -> bool:
+    return a[0] <= b[1] and b[0] <= a[1] and a[2] <= b[3] and b[2] <= a[3]
+
+def merge_boxes(boxes: List[Box]) -> List[Box]:
+    """Merge overlapping or edge-sharing boxes until every box is separate"""
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        for box in boxes:
+            for index, other in enumerate(result):
+                if _touches(box, other):
+                    result[index] = (min(box[0], other[0]), max(box[1], other[1]),
+                                     min(box[2], other[2]), max(box[3], other[3]))
+                    merged = True
+                    break
+            else:
+                result.append(box)
+        boxes = result
+    return boxes
+
+def reading_order(boxes: List[Box]) -> List[int]:
+    """
+    Indices of boxes in reading order, by XY-cut on the boxes themselves: split at the
+    widest blank band between boxes, columns left to right or blocks top to bottom
+    """
+    def order(indices):
+        best_gap, best_groups = None, None
+        for start, end in ((0, 1), (2, 3)):
+            ordered = sorted(indices, key=lambda index: boxes[index][start])
+            groups, reach, widest = [[ordered[0]]], boxes[ordered[0]][end], None
+            for index in ordered[1:]:
+                if boxes[index][start] >= reach:
+                    widest = max(widest or 0, boxes[index][start] - reach)
+                    groups.append([])
+                groups[-1].append(index)
+                reach = max(reach, boxes[index][end])
+            if widest is not None and (best_gap is None or widest > best_gap):
+                best_gap, best_groups = widest, groups
+        if best_groups is None:
+            # Boxes overlap on both axes; fall back to top-left order
+            return sorted(indices, key=lambda index: (boxes[index][0], boxes[index][2]))
+        return [index for group in best_groups for index in order(group)]
+
+    return order(list(range(len(boxes)))) if boxes else []
+
+class ScreenTextModel:
+    """
+    Text of the screen as a set of OCR'd regions, updated incrementally.
+    Each new frame is diffed tile by tile against the last one; only text regions in
+    changed areas are re-detected and OCR'd, and the rest keep their text.
+    """
+
+    def __init__(self, ocr_engine, tile_size: int = SCREEN_TILE_SIZE, cache_size: int = REGION_CACHE_SIZE):
+        self.ocr_engine = ocr_engine
+        self.tile_size = tile_size
+        self.cache_size = cache_size
+        self.regions = []  # [{'box': Box, 'text': str}]
+        self._previous = None
+        self._sequence = None
+        self._text_cache = OrderedDict()  # region pixel digest -> text, least recently used first
+        self._lock = threading.Lock()
+
+    @property
+    def text(self) -> str:
+        """Region texts joined in reading order"""
+        return "\n".join(region['text'] for region in self.regions if region['text'])
+
+    def _dirty_boxes(self, gray: np.ndarray) -> Tuple[List[Box], List[Dict[str, Any]]]:
+        """
+        Pixel boxes of changed screen areas, grown to cover every cached region they touch,
+        and the regions left untouched. The model itself is not changed, so a failed OCR
+        pass leaves it as it was.
+        """
+        height, width = gray.shape
+        if self._previous is None or self._previous.shape != gray.shape:
+            return [(0, height, 0, width)], []
+
+        size = self.tile_size
+        boxes = [(row * size, min((row + 1) * size, height), col * size, min((col + count) * size, width))
+                 for row, col, count in tile_runs(changed_tiles(self._previous, gray, size))]
+        # A region that changes anywhere is detected again as a whole, which can pull in more regions
+        kept = self.regions
+        while True:
+            boxes = merge_boxes(boxes)
+            touched = [region for region in kept
+                       if any(_overlaps(region['box'], box) for box in boxes)]
+            if not touched:
+                return boxes, kept
+            kept = [region for region in kept if region not in touched]
+            boxes.extend(region['box'] for region in touched)
+
+    def _ocr_regions(self, page: np.ndarray, boxes: List[Box]) -> Tuple[List[str], int]:
+        """Text of each region, OCR'ing only regions whose pixels are not cached"""
+        digests = [_region_digest(page[top:bottom, left:right]) for top, bottom, left, right in boxes]
+        texts = [self._text_cache.get(digest) for digest in digests]
+        missing = [index for index, text in enumerate(texts) if text is None]
+        extracted = self.ocr_engine.extract_text_regions(page, [boxes[index] for index in missing])
+        for index, text in zip(missing, extracted):
+            texts[index] = text
+
+        for digest, text in zip(digests, texts):
+            self._text_cache[digest] = text
+            self._text_cache.move_to_end(digest)
+        while len(self._text_cache) > self.cache_size:
+            self._text_cache.popitem(last=False)
+        return texts, len(missing)
+
+    def update(self, image: Image.Image, sequence: int = None) -> Dict[str, Any]:
+        """Bring the model up to date with a frame and return the screen text"""
+        with self._lock:
+            if sequence is not None and sequence == self._sequence:
+                return {'text': self.text, 'regions': len(self.regions), 'ocr_regions': 0}
+
+            gray = np.asarray(image.convert('L'))
+            dirty, model_regions = self._dirty_boxes(gray)
+            new_boxes = []
+            pages = []
+            for top, bottom, left, right in dirty:
+                # Only changed areas are binarized; regions come back relative to the area
+                page = binarize_screen(gray[top:bottom, left:right])
+                regions = find_text_regions(page == 0, row_gap=SCREEN_LINE_GAP, min_side=SCREEN_MIN_REGION_SIDE)
+                pages.append((page, regions))
+                new_boxes.extend((top + r_top, top + r_bottom, left + r_left, left + r_right)
+                                 for r_top, r_bottom, r_left, r_right in regions)
+
+            ocr_count = 0
+            if new_boxes:
+                # OCR every new region in one parallel batch on a page covering all the changed areas
+                full_page = np.full(gray.shape, 255, dtype=np.uint8)
+                for (top, bottom, left, right), (page, _) in zip(dirty, pages):
+                    full_page[top:bottom, left:right] = page
+                texts, ocr_count = self._ocr_regions(full_page, new_boxes)
+                model_regions = model_regions + [{'box': box, 'text': text} for box, text in zip(new_boxes, texts)]
+                model_regions = [model_regions[index]
+                                 for index in reading_order([region['box'] for region in model_regions])]
+
+            # Only now that OCR has succeeded, so the regions always match the frame they are diffed against
+            self.regions = model_regions
+            self._previous = gray
+            self._sequence = sequence
+            return {'text': self.text, 'regions': len(self.regions), 'ocr_regions': ocr_count}
@@ -0,0 +1,183 @@
+import os
+import io
+import wave
+import itertools
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, Iterator, Union
+
+try:
+    from google.cloud import speech
+except ImportError:
+    speech = None
+
+# Streamed audio is sent in pieces of this size; Google caps one streaming request at 25 KB
+STREAM_CHUNK_BYTES = 16 * 1024
+
+# BCP-47 codes for the language names and short codes the tutor routes accept
+LANGUAGE_CODES = {
+    'en': 'en-US', 'english': 'en-US',
+    'es': 'es-ES', 'spanish': 'es-ES',
+    'fr': 'fr-FR', 'french': 'fr-FR',
+    'de': 'de-DE', 'german': 'de-DE',
+    'zh': 'zh-CN', 'chinese': 'zh-CN',
+    'hi': 'hi-IN', 'hindi': 'hi-IN',
+    'ar': 'ar-SA', 'arabic': 'ar-SA',
+    'ru': 'ru-RU', 'russian': 'ru-RU',
+    'pt': 'pt-BR', 'portuguese': 'pt-BR',
+    'ja': 'ja-JP', 'japanese': 'ja-JP',
+}
+
+def language_code(language: str) -> str:
+    """BCP-47 code for a language name or short code, passing full codes through"""
+    return LANGUAGE_CODES.get((language or 'en').lower(), language)
+
+def detect_audio_format(header: bytes) -> Dict[str, Any]:
+    """
+    Encoding and sample rate of audio from its first bytes.
+    Browsers' MediaRecorder produces WebM or Ogg Opus at 48 kHz; WAV carries its rate in the header.
+    """
+    if header.startswith(b'\x1a\x45\xdf\xa3'):
+        return {'encoding': 'WEBM_OPUS', 'sample_rate': 48000}
+    if header.startswith(b'OggS'):
+        return {'encoding': 'OGG_OPUS', 'sample_rate': 48000}
+    if header.startswith(b'fLaC'):
+        return {'encoding': 'FLAC', 'sample_rate': None}
+    if header.startswith(b'RIFF') and header[8:12] == b'WAVE':
+        try:
+            with wave.open(io.BytesIO(header)) as wav:
+                return {'encoding': 'LINEAR16', 'sample_rate': wav.getframerate(), 'channels': wav.getnchannels()}
+        except (wave.Error, EOFError):
+            return {'encoding': 'LINEAR16', 'sample_rate': None}
+    # Raw PCM, as the service has always assumed
+    return {'encoding': 'LINEAR16', 'sample_rate': 16000}
+
+class SpeechBackend(ABC):
+    """Interface for speech-to-text engines; subclasses implement stream_transcribe"""
+
+    name = 'base'
+
+    def transcribe(self, audio: bytes, language: str = 'en') -> str:
+        """Transcribe a complete recording"""
+        final = ''
+        for result in self.stream_transcribe([audio], language, interim_results=False):
+            if result['is_final']:
+                final = result['text']
+        return final
+
+    @abstractmethod
+    def stream_transcribe(self, chunks: Iterable[bytes], language: str = 'en',
+                          interim_results: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Transcribe audio as it arrives. Yields dicts with the newest 'transcript' segment,
+        whether it 'is_final', and the whole 'text' so far (finalized segments plus the
+        current partial).
+        """
+
+class GoogleSpeechBackend(SpeechBackend):
+    """
+    Google Cloud Speech over a small pool of long-lived clients.
+    Each client holds a gRPC channel, so creating one per request costs a TLS handshake;
+    the pool spreads concurrent streams over a few channels instead.
+    """
+
+    name = 'google'
+
+    def __init__(self, pool_size: int = None):
+        if speech is None:
+            raise RuntimeError("google-cloud-speech is not installed")
+        self.pool_size = pool_size or int(os.environ.get('SPEECH_CLIENT_POOL_SIZE', 2))
+        self._clients = []
+        self._next_client = None
+        self._lock = threading.Lock()
+
+    def _client(self):
+        """Next client from the pool, creating clients on first use"""
+        with self._lock:
+            if not self._clients:
+                self._clients = [speech.SpeechClient() for _ in range(self.pool_size)]
+                self._next_client = itertools.cycle(self._clients)
+            return next(self._next_client)
+
+    def _config(self, audio_format: Dict[str, Any], language: str, interim_results: bool):
+        config = speech.RecognitionConfig(
+            encoding=getattr(speech.RecognitionConfig.AudioEncoding, audio_format['encoding']),
+            language_code=language_code(language),
+            enable_automatic_punctuation=True,
+        )
+        if audio_format.get('sample_rate'):
+            config.sample_rate_hertz = audio_format['sample_rate']
+        if audio_format.get('channels', 1) > 1:
+            config.audio_channel_count = audio_format['channels']
+        return speech.StreamingRecognitionConfig(config=config, interim_results=interim_results)
+
+    def stream_transcribe(self, chunks: Iterable[bytes], language: str = 'en',
+                          interim_results: bool = True) -> Iterator[Dict[str, Any]]:
+        # Streaming recognition has no one-minute limit, unlike recognize(), so long recordings work too
+        chunks = iter(chunks)
+        first = b''
+        for first in chunks:
+            if first:
+                break
+        if not first:
+            return
+        streaming_config = self._config(detect_audio_format(first), language, interim_results)
+
+        def requests():
+            for chunk in itertools.chain([first], chunks):
+                for offset in range(0, len(chunk), STREAM_CHUNK_BYTES):
+                    yield speech.StreamingRecognizeRequest(audio_content=chunk[offset:offset + STREAM_CHUNK_BYTES])
+
+        finals = []
+        responses = self._client().streaming_recognize(config=streaming_config, requests=requests())
+        for response in responses:
+            for result in response.results:
+                if not result.alternatives:
+                    continue
+                transcript = result.alternatives[0].transcript.strip()
+                if result.is_final:
+                    finals.append(transcript)
+                yield {
+                    'transcript': transcript,
+                    'is_final': result.is_final,
+                    'text': ' '.join(finals if result.is_final else finals + [transcript])
+                }
+
+class LocalSpeechBackend(SpeechBackend):
+    """
+    Offline stand-in for tests and development without cloud credentials.
+    Produces a scripted transcript, revealing one more word per audio chunk received
+    so clients see partial results arrive like they would from a real engine.
+    """
+
+    name = 'local'
+
+    def __init__(self, transcript: Union[str, Callable[[bytes], str]] = None):
+        """transcript is a fixed string or a function of the complete audio"""
+        self.transcript = transcript if transcript is not None else os.environ.get('SPEECH_LOCAL_TRANSCRIPT', '')
+
+    def stream_transcribe(self, chunks: Iterable[bytes], language: str = 'en',
+                          interim_results: bool = True) -> Iterator[Dict[str, Any]]:
+        received = []
+        words = None if callable(self.transcript) else self.transcript.split()
+        for chunk in chunks:
+            received.append(chunk)
+            if interim_results and words:
+                partial = ' '.join(words[:len(received)])
+                yield {'transcript': partial, 'is_final': False, 'text': partial}
+
+        text = self.transcript(b''.join(received)) if callable(self.transcript) else self.transcript
+        if received:
+            yield {'transcript': text, 'is_final': True, 'text': text}
+
+SPEECH_BACKENDS = {
+    'google': GoogleSpeechBackend,
+    'local': LocalSpeechBackend,
+}
+
+def create_speech_backend(name: str = None) -> SpeechBackend:
+    """Speech backend named by SPEECH_BACKEND, Google by default"""
+    name = (name or os.environ.get('SPEECH_BACKEND', 'google')).lower()
+    if name not in SPEECH_BACKENDS:
+        raise ValueError(f"Unknown speech backend: {name}")
+    return SPEECH_BACKENDS[name]()
@@ -1,43 +1,274 @@
 import os
+import re
+import queue
+import hashlib
 import tempfile
-from typing import Optional
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from werkzeug.datastructures import FileStorage
-from google.cloud import speech
-from google.cloud import texttospeech
+from services.speech_backends import STREAM_CHUNK_BYTES, SpeechBackend, create_speech_backend, language_code
+from services.audio_preprocessing import AudioNormalizer, audio_normalizer
+from services.audio_cache import DiskLRUCache
+
+try:
+    from google.cloud import texttospeech
+except ImportError:
+    texttospeech = None
+
+# Google accepts up to 5000 bytes of input per synthesis request
+TTS_MAX_SENTENCE_CHARS = 1500
+# Markdown markup the model adds to answers that should not be read aloud
+MARKDOWN_MARKUP = re.compile(r'[*_`#>|~]+')
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+|\n+')
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences for synthesis, stripping markdown and splitting overlong ones"""
+    sentences = []
+    for sentence in SENTENCE_END.split(MARKDOWN_MARKUP.sub('', text)):
+        sentence = ' '.join(sentence.split())
+        while len(sentence) > TTS_MAX_SENTENCE_CHARS:
+            cut = sentence.rfind(' ', 0, TTS_MAX_SENTENCE_CHARS)
+            cut = cut if cut > 0 else TTS_MAX_SENTENCE_CHARS
+            sentences.append(sentence[:cut])
+            sentence = sentence[cut:].strip()
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+class TranscriptionStream:
+    """
+    One live transcription: audio chunks are fed in as the client uploads them and a
+    background thread passes them to the backend, recording each partial or final result
+    as an event that readers can wait for
+    """
+
+    def __init__(self, backend: SpeechBackend, language: str = "en", idle_timeout: float = 30.0):
+        self.id = uuid.uuid4().hex
+        self.backend = backend
+        self.language = language
+        self.idle_timeout = idle_timeout
+        self.events = []
+        self.done = False
+        self.error = None
+        self.updated = time.time()
+        self._chunks = queue.Queue()
+        self._lock = threading.Lock()
+        self._new_event = threading.Condition(self._lock)
+        self._thread = threading.Thread(target=self._run, name=f'transcribe-{self.id[:8]}', daemon=True)
+        self._thread.start()
+
+    def feed(self, chunk: bytes) -> None:
+        """Queue the next piece of audio"""
+        if chunk:
+            self.updated = time.time()
+            self._chunks.put(chunk)
+
+    def finish(self) -> None:
+        """Mark the end of the audio so the final transcript can be produced"""
+        self._chunks.put(None)
+
+    def _audio(self) -> Iterator[bytes]:
+        while True:
+            try:
+                chunk = self._chunks.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                # The client went away without finishing; end the recognition
+                return
+            if chunk is None:
+                return
+            yield chunk
+
+    def _publish(self, event: Dict[str, Any]) -> None:
+        with self._new_event:
+            event["sequence"] = len(self.events) + 1
+            self.events.append(event)
+            self.updated = time.time()
+            self._new_event.notify_all()
+
+    def _run(self) -> None:
+        text = ""
+        try:
+            for result in self.backend.stream_transcribe(self._audio(), self.language):
+                text = result["text"]
+                self._publish(dict(result))
+        except Exception as e:
+            print(f"Streaming transcription failed: {e}")
+            self.error = str(e)
+        with self._new_event:
+            self.done = True
+        self._publish({"text": text, "is_final": True, "done": True, "error": self.error})
+
+    def wait_for_events(self, after_sequence: int = 0, timeout: float = None) -> List[Dict[str, Any]]:
+        """Block until there are events newer than after_sequence and return them, oldest first"""
+        with self._new_event:
+            self._new_event.wait_for(lambda: len(self.events) > after_sequence, timeout=timeout)
+            return self.events[after_sequence:]
 
 class SpeechService:
     """Service for processing speech input"""
     
+    def __init__(self, backend: SpeechBackend = None, max_streams: int = None, normalizer: AudioNormalizer = None):
+        """backend defaults to SPEECH_BACKEND; pass LocalSpeechBackend in tests"""
+        self.backend = backend
+        self.normalizer = normalizer or audio_normalizer
+        if self.backend is None:
+            try:
+                self.backend = create_speech_backend()
+            except (RuntimeError, ValueError) as e:
+                print(f"Speech recognition not available: {e}")
+        self.max_streams = max_streams or int(os.environ.get('SPEECH_MAX_STREAMS', 32))
+        self._streams = OrderedDict()
+        self._streams_lock = threading.Lock()
+        
+        # Sentences are synthesized in parallel, a bounded number ahead of what has been sent
+        self.tts_lookahead = int(os.environ.get('TTS_LOOKAHEAD', 4))
+        self._tts_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('TTS_WORKERS', 4)),
+                                                thread_name_prefix='tts')
+        self._tts_client_instance = None
+        self._tts_lock = threading.Lock()
+        self.tts_cache = DiskLRUCache(
+            os.environ.get('TTS_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'bloom_tts_cache')),
+            int(os.environ.get('TTS_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+        )
+    
     def transcribe_audio(self, audio_file: FileStorage, language: str = "en") -> str:
         """
         Transcribe speech to text
         """
         if not audio_file:
             return ""
-        client = speech.SpeechClient()
-        with open(audio_file, "rb") as audio:
-            audio_content = audio.read()
-        audio = speech.RecognitionAudio(content=audio_content)
-        config = speech.RecognitionConfig(
-            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-            language_code=language,
-        )
-        response = client.recognize(config=config, audio=audio)
-        if response.results:
-            return response.results[0].alternatives[0].transcript
-        return ""
+        return self.transcribe(audio_file.read(), language)["text"]
+    
+    def transcribe(self, audio: bytes, language: str = "en") -> Dict[str, Any]:
+        """
+        Transcribe a recording after resampling it to 16 kHz mono and trimming silence.
+        Returns the text with the audio durations before and after normalization.
+        """
+        if self.backend is None:
+            raise RuntimeError("Speech recognition is not available")
         
+        prepared, stats = self._prepare(audio)
+        if stats is not None and not prepared:
+            # Nothing but silence; no need to pay for recognition
+            return {"text": "", "audio": stats}
+        return {"text": self.backend.transcribe(prepared, language), "audio": stats}
+    
+    def _prepare(self, audio: bytes) -> Tuple[bytes, Optional[Dict[str, Any]]]:
+        """Normalized audio with its stats, or the audio unchanged and None when it cannot be decoded here"""
+        normalized = self.normalizer.normalize(audio)
+        if normalized is None:
+            # Formats this server cannot decode go to the recognizer unchanged
+            return audio, None
+        stats = {key: value for key, value in normalized.items() if key != "audio"}
+        stats["processed_bytes"] = len(normalized["audio"])
+        return normalized["audio"], stats
     
-    def text_to_speech(self, text: str, language: str = "en") -> bytes:
+    def transcribe_stream(self, audio: bytes, language: str = "en") -> Iterator[Dict[str, Any]]:
         """
-        Convert text to speech
+        Transcribe a complete recording through a live transcription, so partial results
+        can be passed on while recognition runs. Yields the stream's events; the last one
+        is marked done and carries the normalization stats under 'audio'.
+        Raises RuntimeError at once, rather than on iteration, if recognition is not available.
         """
-        client = texttospeech.TextToSpeechClient()
-        input_text = texttospeech.SynthesisInput(text=text)
-        voice = texttospeech.VoiceSelectionParams(language_code=language, ssml_gender=texttospeech.SsmlVoiceGender.NEUTRAL)
+        return self._recording_events(self.start_stream(language), audio)
+    
+    def _recording_events(self, stream: TranscriptionStream, audio: bytes) -> Iterator[Dict[str, Any]]:
+        stats = None
+        try:
+            prepared, stats = self._prepare(audio)
+            # Fed in pieces so the backend can report partial results as it goes
+            for offset in range(0, len(prepared), STREAM_CHUNK_BYTES):
+                stream.feed(prepared[offset:offset + STREAM_CHUNK_BYTES])
+        finally:
+            stream.finish()
+        
+        sequence = 0
+        try:
+            while True:
+                for event in stream.wait_for_events(sequence, timeout=stream.idle_timeout):
+                    sequence = event["sequence"]
+                    if event.get("done"):
+                        yield dict(event, audio=stats)
+                        return
+                    yield event
+        finally:
+            with self._streams_lock:
+                self._streams.pop(stream.id, None)
+    
+    def start_stream(self, language: str = "en") -> TranscriptionStream:
+        """Begin a live transcription that partial results can be read from while audio arrives"""
+        if self.backend is None:
+            raise RuntimeError("Speech recognition is not available")
+        stream = TranscriptionStream(self.backend, language)
+        with self._streams_lock:
+            # Forget streams nobody has touched for a while, then the oldest if still full
+            now = time.time()
+            for stream_id, old in list(self._streams.items()):
+                if now - old.updated > old.idle_timeout * 2:
+                    old.finish()
+                    del self._streams[stream_id]
+            while len(self._streams) >= self.max_streams:
+                _, old = self._streams.popitem(last=False)
+                old.finish()
+            self._streams[stream.id] = stream
+        return stream
+    
+    def get_stream(self, stream_id: str) -> Optional[TranscriptionStream]:
+        """Live transcription by id"""
+        with self._streams_lock:
+            return self._streams.get(stream_id)
+    
+    def _tts_client(self):
+        """Long-lived synthesis client, created on first use"""
+        if texttospeech is None:
+            raise RuntimeError("google-cloud-texttospeech is not installed")
+        with self._tts_lock:
+            if self._tts_client_instance is None:
+                self._tts_client_instance = texttospeech.TextToSpeechClient()
+            return self._tts_client_instance
+    
+    def _synthesize_sentence(self, sentence: str, language: str, voice: Optional[str]) -> bytes:
+        """MP3 audio for one sentence, from the cache when this sentence was spoken before"""
+        code = language_code(language)
+        key = hashlib.sha256(f"{code}|{voice or ''}|mp3|{sentence}".encode()).hexdigest()
+        audio = self.tts_cache.get(key)
+        if audio is not None:
+            return audio
+        
+        input_text = texttospeech.SynthesisInput(text=sentence)
+        voice_params = texttospeech.VoiceSelectionParams(language_code=code, ssml_gender=texttospeech.SsmlVoiceGender.NEUTRAL)
+        if voice:
+            voice_params.name = voice
         audio_config = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3)
-        response = client.synthesize_speech(input=input_text, voice=voice, audio_config=audio_config)
+        response = self._tts_client().synthesize_speech(input=input_text, voice=voice_params, audio_config=audio_config)
+        self.tts_cache.put(key, response.audio_content)
         return response.audio_content
+    
+    def synthesize_stream(self, text: str, language: str = "en", voice: str = None) -> Iterator[bytes]:
+        """
+        Yield MP3 audio sentence by sentence, in order, as soon as each is ready.
+        Sentences are synthesized concurrently a few ahead of playback, so the first
+        one can start playing while the rest are still being generated.
+        """
+        self._tts_client()
+        pending = deque()
+        for sentence in split_sentences(text):
+            pending.append(self._tts_executor.submit(self._synthesize_sentence, sentence, language, voice))
+            if len(pending) >= self.tts_lookahead:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    
+    def text_to_speech(self, text: str, language: str = "en", voice: str = None) -> bytes:
+        """
+        Convert text to speech
+        """
+        # MP3 frames are self-contained, so per-sentence audio concatenates into one file
+        return b"".join(self.synthesize_stream(text, language, voice))
 
         """
         offline example using pyttsx3
@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+class WindowTextExtractor:
+    """
+    Extracts the text of windows from the accessibility tree incrementally.
+    Each window's elements are cached by id. A full scan of the window runs at most every
+    full_scan_interval seconds; in between only "hot" elements, the ones that changed
+    recently (usually the box the student is typing in), are re-read, one request each.
+    When more than max_hot_reads elements are hot, a single full scan is cheaper than that
+    many requests and runs instead. Every extraction returns the full text and a delta
+    against the previous one.
+
+    Between full scans the text can be stale: changes to elements that are not hot, and
+    elements added to the window, show up only at the next full scan, so up to
+    full_scan_interval seconds late. Pass full_scan=True when that matters.
+    """
+
+    def __init__(self, client, locator_factory: Callable[[List[str]], Any], full_scan_interval: float = None,
+                 max_hot: int = 16, max_hot_reads: int = None, hot_decay: int = 10, max_windows: int = 16):
+        """
+        locator_factory builds a locator from a selector chain, e.g. desktop_use Locator;
+        with a fake client it can return anything the client's find_elements accepts.
+        Elements leave the hot set after hot_decay unchanged reads.
+        """
+        self.client = client
+        self.locator_factory = locator_factory
+        self.full_scan_interval = full_scan_interval or float(os.environ.get('WINDOW_TEXT_FULL_SCAN_INTERVAL', 5.0))
+        self.max_hot = max_hot
+        self.max_hot_reads = max_hot_reads if max_hot_reads is not None else int(os.environ.get('WINDOW_TEXT_MAX_HOT_READS', 4))
+        self.hot_decay = hot_decay
+        self.max_windows = max_windows
+        self._windows = OrderedDict()  # window id -> cached elements, least recently used first
+        self._lock = threading.Lock()
+
+    def _find_elements(self, selector_chain: List[str]) -> List[Any]:
+        # Elements without a label carry no text
+        return [element for element in self.client.find_elements(self.locator_factory(selector_chain))
+                if getattr(element, 'label', None)]
+
+    def _full_scan(self, window_id: str, cache: Dict[str, Any]) -> None:
+        """Re-read every element of the window and mark the changed ones hot"""
+        elements = self._find_elements([f'window:{window_id}'])
+        labels = OrderedDict((element.id, element.label) for element in elements)
+        previous, hot = cache['labels'], cache['hot']
+        for element_id, label in labels.items():
+            if previous and previous.get(element_id) != label:
+                hot[element_id] = 0
+                hot.move_to_end(element_id)
+            elif element_id in hot:
+                # Unchanged hot elements cool down here too, or a burst of changes would
+                # keep forcing full scans
+                hot[element_id] += 1
+                if hot[element_id] >= self.hot_decay:
+                    hot.pop(element_id)
+        for element_id in [element_id for element_id in hot if element_id not in labels]:
+            hot.pop(element_id)
+        cache['labels'] = labels
+        cache['scanned_at'] = time.time()
+        # Keep the most recently changed elements when there are too many
+        while len(cache['hot']) > self.max_hot:
+            cache['hot'].pop(next(iter(cache['hot'])))
+
+    def _refresh_hot(self, window_id: str, cache: Dict[str, Any]) -> None:
+        """Re-read only the hot elements"""
+        for element_id in list(cache['hot']):
+            matches = self._find_elements([f'window:{window_id}', f'id:{element_id}'])
+            if not matches:
+                # The element is gone; the next full scan will pick up whatever replaced it
+                cache['hot'].pop(element_id)
+                cache['labels'].pop(element_id, None)
+                continue
+            label = matches[0].label
+            if label != cache['labels'].get(element_id):
+                cache['labels'][element_id] = label
+                cache['hot'][element_id] = 0
+            else:
+                cache['hot'][element_id] += 1
+                if cache['hot'][element_id] >= self.hot_decay:
+                    cache['hot'].pop(element_id)
+
+    def extract(self, window_id: str, full_scan: bool = False) -> Dict[str, Any]:
+        """Current text of a window and what changed since the previous extraction"""
+        with self._lock:
+            cache = self._windows.pop(window_id, None)
+            if cache is None:
+                cache = {'labels': OrderedDict(), 'hot': OrderedDict(), 'scanned_at': 0.0}
+            self._windows[window_id] = cache
+            while len(self._windows) > self.max_windows:
+                self._windows.popitem(last=False)
+
+            previous = dict(cache['labels'])
+            full_scan = (full_scan or time.time() - cache['scanned_at'] >= self.full_scan_interval
+                         or len(cache['hot']) > self.max_hot_reads)
+            if full_scan:
+                self._full_scan(window_id, cache)
+            else:
+                self._refresh_hot(window_id, cache)
+
+            labels = cache['labels']
+            return {
+                'text': "\n".join(labels.values()),
+                'delta': {
+                    'added': [label for element_id, label in labels.items() if element_id not in previous],
+                    'removed': [label for element_id, label in previous.items() if element_id not in labels],
+                    'changed': [{'old': previous[element_id], 'new': label} for element_id, label in labels.items()
+                                if element_id in previous and previous[element_id] != label]
+                },
+                'full_scan': full_scan,
+                'elements': len(labels),
+                'hot_elements': len(cache['hot'])
+            }
+
+    def forget(self, window_id: Optional[str] = None) -> None:
+        """Drop the cache for one window, or for every window"""
+        with self._lock:
+            if window_id is None:
+                self._windows.clear()
+            else:
+                self._windows.pop(window_id, None)
@@ -0,0 +1,43 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional
+
+@dataclass
+class FakeElement:
+    """The fields of desktop_use's ElementResponse that text extraction reads"""
+    id: str
+    label: Optional[str] = None
+    role: str = 'text'
+
+class FakeDesktopUseClient:
+    """
+    In-memory stand-in for desktop_use's DesktopUseClient: windows of labelled elements
+    that tests edit directly. Every find_elements request is recorded in requests, so tests
+    can check how much of the tree a caller read. Locators are plain selector chains.
+    """
+
+    def __init__(self):
+        self.windows = {}  # window id -> OrderedDict of element id -> FakeElement
+        self.requests = []
+
+    def set_label(self, window_id: str, element_id: str, label: str) -> None:
+        """Add an element, or change the label of an existing one"""
+        elements = self.windows.setdefault(window_id, OrderedDict())
+        if element_id in elements:
+            elements[element_id].label = label
+        else:
+            elements[element_id] = FakeElement(element_id, label)
+
+    def remove(self, window_id: str, element_id: str) -> None:
+        self.windows[window_id].pop(element_id, None)
+
+    def find_elements(self, selector_chain: List[str]) -> List[FakeElement]:
+        self.requests.append(list(selector_chain))
+        window_selector, *selectors = selector_chain
+        elements = list(self.windows.get(window_selector[len('window:'):], {}).values())
+        for selector in selectors:
+            kind, _, value = selector.partition(':')
+            if kind != 'id':
+                raise ValueError(f"Unsupported selector: {selector}")
+            elements = [element for element in elements if element.id == value]
+        return [FakeElement(element.id, element.label, element.role) for element in elements]
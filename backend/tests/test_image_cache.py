@@ -0,0 +1,53 @@
+from io import BytesIO
+from PIL import Image, ImageDraw
+from services.image_cache import PerceptualHashCache, image_key
+
+def worksheet(answers):
+    """A page of equations laid out the same way whatever the numbers are"""
+    page = Image.new('RGB', (850, 1100), 'white')
+    draw = ImageDraw.Draw(page)
+    draw.rectangle((40, 40, 810, 110), outline='black', width=3)
+    draw.text((60, 65), 'Worksheet 4: Linear equations', fill='black')
+    for index, answer in enumerate(answers):
+        y = 160 + index * 90
+        draw.text((60, y), f'{index + 1}. Solve 3x + 7 = {answer}', fill='black')
+        draw.line((60, y + 40, 790, y + 40), fill='gray')
+    return page
+
+def reencode(image, **options):
+    buffer = BytesIO()
+    image.save(buffer, **options)
+    return Image.open(BytesIO(buffer.getvalue()))
+
+def test_pages_with_the_same_layout_do_not_share_an_entry():
+    cache = PerceptualHashCache(max_entries=8)
+    first = worksheet([22, 16, 31, 10, 25, 19])
+    second = worksheet([22, 16, 31, 10, 25, 13])
+    cache.put(image_key(first), 'ocr', 'first page')
+
+    assert cache.get(image_key(second), 'ocr') is None
+    cache.put(image_key(second), 'ocr', 'second page')
+    assert cache.get(image_key(first), 'ocr') == 'first page'
+    assert cache.get(image_key(second), 'ocr') == 'second page'
+
+def test_identical_pixels_hit_whatever_the_encoding():
+    cache = PerceptualHashCache(max_entries=8)
+    page = worksheet([22, 16, 31])
+    cache.put(image_key(page), 'ocr', 'text')
+
+    assert cache.get(image_key(reencode(page, format='PNG')), 'ocr') == 'text'
+
+def test_recompressed_copy_shares_the_entry():
+    cache = PerceptualHashCache(max_entries=8)
+    page = worksheet([22, 16, 31])
+    cache.put(image_key(page), 'ocr', 'text')
+
+    assert cache.get(image_key(reencode(page, format='JPEG', quality=75)), 'ocr') == 'text'
+
+def test_evicted_entries_are_no_longer_found():
+    cache = PerceptualHashCache(max_entries=1)
+    first = worksheet([22])
+    cache.put(image_key(first), 'ocr', 'first')
+    cache.put(image_key(worksheet([99, 98, 97, 96])), 'ocr', 'second')
+
+    assert cache.get(image_key(first), 'ocr') is None
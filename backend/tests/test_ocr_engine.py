@@ -0,0 +1,29 @@
+import threading
+import time
+from concurrent.futures import Future
+import pytest
+from services.ocr_engine import OCREngine
+
+def later(delay, action):
+    timer = threading.Timer(delay, action)
+    timer.start()
+    return timer
+
+def test_time_in_the_queue_does_not_count_against_the_timeout():
+    engine = OCREngine(workers=1, max_pending=4, task_timeout=0.25, queue_timeout=0)
+    future = Future()
+    # Queued for longer than the task timeout, then done quickly once started
+    later(0.3, future.set_running_or_notify_cancel)
+    later(0.4, lambda: future.set_result('text'))
+
+    assert engine._result(future) == 'text'
+
+def test_a_started_task_still_times_out():
+    engine = OCREngine(workers=1, max_pending=4, task_timeout=0.1, queue_timeout=0)
+    future = Future()
+    future.set_running_or_notify_cancel()
+
+    started = time.monotonic()
+    with pytest.raises(RuntimeError, match='timed out'):
+        engine._result(future)
+    assert time.monotonic() - started < 1
@@ -0,0 +1,41 @@
+import pytest
+from PIL import Image, ImageDraw
+from services.screen_text import ScreenTextModel
+
+class FakeOCREngine:
+    """Reads each region as its box, and fails when told to, like a busy OCR pool"""
+
+    def __init__(self):
+        self.fail = False
+        self.calls = 0
+
+    def extract_text_regions(self, page, regions):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError('OCR engine is busy')
+        return [f'text at {top},{left}' for top, bottom, left, right in regions]
+
+def screen(lines):
+    image = Image.new('RGB', (640, 480), 'white')
+    draw = ImageDraw.Draw(image)
+    for row, line in enumerate(lines):
+        draw.text((20, 20 + row * 100), line, fill='black')
+    return image
+
+def test_failed_ocr_keeps_the_previous_text_and_retries_the_change():
+    engine = FakeOCREngine()
+    model = ScreenTextModel(engine)
+    first = model.update(screen(['x = 1', 'y = 2']))
+    assert first['regions'] == 2
+
+    engine.fail = True
+    with pytest.raises(RuntimeError):
+        model.update(screen(['x = 10', 'y = 2']))
+    assert model.text == first['text']
+    assert len(model.regions) == 2
+
+    # The next frame is diffed against the last frame that was OCR'd, so the change is not lost
+    engine.fail = False
+    result = model.update(screen(['x = 10', 'y = 2']))
+    assert result['ocr_regions'] == 1
+    assert result['regions'] == 2
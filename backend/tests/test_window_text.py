@@ -0,0 +1,91 @@
+from services.window_text import WindowTextExtractor
+from fake_desktop_use import FakeDesktopUseClient
+
+def make_window(client, count=6):
+    for index in range(count):
+        client.set_label('42', f'e{index}', f'line {index}')
+
+def make_extractor(client, **options):
+    # A long interval so only the tests decide when full scans happen
+    return WindowTextExtractor(client, list, full_scan_interval=3600, **options)
+
+def test_first_extraction_is_a_full_scan():
+    client = FakeDesktopUseClient()
+    make_window(client)
+    extractor = make_extractor(client)
+
+    result = extractor.extract('42')
+
+    assert result['full_scan']
+    assert result['text'] == '\n'.join(f'line {index}' for index in range(6))
+    assert result['delta']['added'] == [f'line {index}' for index in range(6)]
+    assert client.requests == [['window:42']]
+
+def test_hot_refresh_rereads_only_changed_elements():
+    client = FakeDesktopUseClient()
+    make_window(client)
+    extractor = make_extractor(client)
+    extractor.extract('42')
+    client.set_label('42', 'e2', 'typing')
+    extractor.extract('42', full_scan=True)
+    client.requests.clear()
+
+    client.set_label('42', 'e2', 'typing more')
+    client.set_label('42', 'e4', 'changed while cold')
+    result = extractor.extract('42')
+
+    assert not result['full_scan']
+    assert client.requests == [['window:42', 'id:e2']]
+    assert result['delta']['changed'] == [{'old': 'typing', 'new': 'typing more'}]
+    # Cold elements stay stale until the next full scan
+    assert 'changed while cold' not in result['text']
+    assert 'changed while cold' in extractor.extract('42', full_scan=True)['text']
+
+def test_removed_hot_element_is_dropped():
+    client = FakeDesktopUseClient()
+    make_window(client)
+    extractor = make_extractor(client)
+    extractor.extract('42')
+    client.set_label('42', 'e1', 'typing')
+    extractor.extract('42', full_scan=True)
+
+    client.remove('42', 'e1')
+    result = extractor.extract('42')
+
+    assert not result['full_scan']
+    assert result['delta']['removed'] == ['typing']
+    assert result['hot_elements'] == 0
+
+def test_many_hot_elements_fall_back_to_one_full_scan():
+    client = FakeDesktopUseClient()
+    make_window(client)
+    extractor = make_extractor(client, max_hot_reads=4)
+    extractor.extract('42')
+    for index in range(5):
+        client.set_label('42', f'e{index}', f'edited {index}')
+    assert extractor.extract('42', full_scan=True)['hot_elements'] == 5
+    client.requests.clear()
+
+    client.set_label('42', 'e5', 'also edited')
+    result = extractor.extract('42')
+
+    assert result['full_scan']
+    assert client.requests == [['window:42']]
+    assert 'also edited' in result['text']
+
+def test_hot_elements_cool_down_during_full_scans():
+    client = FakeDesktopUseClient()
+    make_window(client)
+    extractor = make_extractor(client, max_hot_reads=4, hot_decay=2)
+    extractor.extract('42')
+    for index in range(5):
+        client.set_label('42', f'e{index}', f'edited {index}')
+    extractor.extract('42', full_scan=True)
+
+    extractor.extract('42')
+    result = extractor.extract('42')
+
+    assert result['hot_elements'] == 0
+    client.requests.clear()
+    assert not extractor.extract('42')['full_scan']
+    assert client.requests == []
@@ -1,7 +1,7 @@
 from functools import wraps
 from flask import request, jsonify
-from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
-from models.user import User
+from flask_jwt_extended import verify_jwt_in_request
+from utils.auth_utils import get_current_identity
 
 def admin_required(f):
     """
@@ -10,11 +10,10 @@ def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         verify_jwt_in_request()
-        current_user_id = get_jwt_identity()
         
-        # Check if user exists and is admin
-        user = User.query.get(current_user_id)
-        if not user or not getattr(user, 'is_admin', False):
+        # Check if user exists and is admin; roles come from the token, not the database
+        identity = get_current_identity()
+        if not identity or 'admin' not in identity['roles']:
             return jsonify({'error': 'Admin privileges required'}), 403
             
         return f(*args, **kwargs)
@@ -28,13 +27,10 @@ def role_required(role_name):
         @wraps(f)
         def decorated_function(*args, **kwargs):
             verify_jwt_in_request()
-            current_user_id = get_jwt_identity()
             
             # Check if user exists and has the required role
-            user = User.query.get(current_user_id)
-            # This assumes there's a roles relationship or attribute
-            # You would need to implement this based on your role model
-            if not user or role_name not in getattr(user, 'roles', []):
+            identity = get_current_identity()
+            if not identity or role_name not in identity['roles']:
                 return jsonify({'error': f'Role {role_name} required'}), 403
                 
             return f(*args, **kwargs)
@@ -1,18 +1,151 @@
-from flask_jwt_extended import get_jwt_identity
+import os
+import time
+import threading
+from collections import OrderedDict
+from flask_jwt_extended import get_jwt_identity, get_jwt
 from models.user import User
-from flask import jsonify
+from flask import jsonify, g
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession, object_session
+from models.blacklist import blacklist
 
-def get_current_user():
+class UserCache:
     """
-    Get the current user from JWT token
-    Returns user object or None
+    Short-lived process cache of user identities (id and role names) so authorization does
+    not query the database on every request. Entries expire after ttl seconds. Role and
+    password changes are recorded in the shared revocation store once they commit, so
+    every worker drops its cached identity of the user within a second, and role claims in
+    tokens issued before the change are not trusted, even after a restart. Changes made
+    with raw SQL bypass that record; claims older than claim_max_age seconds are never
+    trusted, which bounds how long such a change goes unnoticed.
+    """
+
+    def __init__(self, ttl: float = None, max_size: int = 1024, claim_max_age: float = None):
+        self.ttl = ttl if ttl is not None else float(os.environ.get('USER_CACHE_TTL', 30))
+        self.max_size = max_size
+        self.claim_max_age = claim_max_age if claim_max_age is not None else float(os.environ.get('ROLE_CLAIM_MAX_AGE', 300))
+        self._entries = OrderedDict()  # user id -> (expires at, loaded at, identity), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        # Checked outside the lock, since it may read changes from the revocation store
+        if entry[0] < time.time() or blacklist.user_changed_since(user_id, entry[1]):
+            with self._lock:
+                if self._entries.get(user_id) is entry:
+                    del self._entries[user_id]
+            return None
+        with self._lock:
+            if user_id in self._entries:
+                self._entries.move_to_end(user_id)
+        return entry[2]
+
+    def put(self, user_id, identity, loaded_at: float) -> None:
+        """Cache an identity read from the database at loaded_at"""
+        with self._lock:
+            self._entries[user_id] = (time.time() + self.ttl, loaded_at, identity)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id) -> None:
+        """Forget a user in this process; other processes learn of the change from the revocation store"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def claims_current(self, user_id, issued_at: float) -> bool:
+        """Whether role claims in a token issued at issued_at can still be trusted"""
+        return issued_at >= time.time() - self.claim_max_age and not blacklist.user_changed_since(user_id, issued_at)
+
+user_cache = UserCache()
+
+def _user_changed(user):
+    """Forget the user now, and record the change for every process when it commits"""
+    if user.id is None:
+        return
+    user_cache.invalidate(user.id)
+    session = object_session(user)
+    if session is not None:
+        session.info.setdefault('changed_users', set()).add(user.id)
+
+@event.listens_for(User.roles, 'append')
+@event.listens_for(User.roles, 'remove')
+def _roles_changed(user, role, initiator):
+    _user_changed(user)
+
+@event.listens_for(User.password_hash, 'set')
+def _password_changed(user, value, old_value, initiator):
+    _user_changed(user)
+
+@event.listens_for(OrmSession, 'after_commit')
+def _record_user_changes(session):
+    for user_id in session.info.pop('changed_users', ()):
+        user_cache.invalidate(user_id)
+        blacklist.mark_user_changed(user_id)
+
+@event.listens_for(OrmSession, 'after_rollback')
+def _discard_user_changes(session):
+    session.info.pop('changed_users', None)
+
+def user_identity(user):
+    """The parts of a user authorization needs, safe to keep after the database session ends"""
+    return {'id': user.id, 'roles': [role.name for role in user.roles]}
+
+def load_identity(user_id):
+    """
+    Identity of any user, from this request, the process cache, or the database in that order
+    Returns identity dict or None
+    """
+    user_id = int(user_id)
+    identities = g.setdefault('_identities', {})
+    if user_id in identities:
+        return identities[user_id]
+
+    identity = user_cache.get(user_id)
+    if identity is None:
+        loaded_at = time.time()
+        user = User.query.get(user_id)
+        identity = user_identity(user) if user else None
+        if identity:
+            user_cache.put(user_id, identity, loaded_at)
+    identities[user_id] = identity
+    return identity
+
+def get_current_identity():
+    """
+    Identity of the user the JWT token belongs to. Tokens issued at login carry the user's
+    roles, so this normally costs no query; tokens without them, older than the claim
+    max age, or issued before the user's roles changed fall back to load_identity.
+    Returns identity dict or None
     """
     try:
-        current_user_id = get_jwt_identity()
-        return User.query.get(current_user_id)
-    except:
+        claims = get_jwt()
+        user_id = int(get_jwt_identity())
+    except Exception:
         return None
 
+    if 'roles' in claims and user_cache.claims_current(user_id, claims.get('iat', 0)):
+        identities = g.setdefault('_identities', {})
+        identities.setdefault(user_id, {'id': user_id, 'roles': claims['roles']})
+        return identities[user_id]
+    return load_identity(user_id)
+
+def get_current_user():
+    """
+    Get the current user from JWT token, loading it at most once per request
+    Returns user object or None
+    """
+    if '_current_user' not in g:
+        try:
+            current_user_id = get_jwt_identity()
+            g._current_user = User.query.get(current_user_id)
+        except:
+            return None
+    return g._current_user
+
 def user_to_dict(user):
     """
     Convert a user object to a dictionary for JSON response
@@ -45,9 +178,10 @@ def authorize_session_access(session_id, user_id):
     if session.user_id == user_id:
         return True
         
-    # Check if user has admin privileges
-    user = User.query.get(user_id)
-    if user and user.is_admin:
+    # Check if user has admin privileges, from the token when it is the current user's
+    current = get_current_identity()
+    identity = current if current and current['id'] == int(user_id) else load_identity(user_id)
+    if identity and 'admin' in identity['roles']:
         return True
         
     return False
\ No newline at end of file
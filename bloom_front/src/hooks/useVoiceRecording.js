@@ -1,6 +1,6 @@
 import { useState, useCallback } from 'react';
 
-export function useVoiceRecording() {
+export function useVoiceRecording({ onChunk, timeslice = 250 } = {}) {
     const [isRecording, setIsRecording] = useState(false);
     const [mediaRecorder, setMediaRecorder] = useState(null);
     const [audioChunks, setAudioChunks] = useState([]);
@@ -13,6 +13,8 @@ export function useVoiceRecording() {
             recorder.ondataavailable = (e) => {
                 if (e.data.size > 0) {
                     setAudioChunks(chunks => [...chunks, e.data]);
+                    // Streaming consumers get each slice as soon as it is recorded
+                    if (onChunk) onChunk(e.data);
                 }
             };
 
@@ -22,13 +24,13 @@ export function useVoiceRecording() {
 
             setMediaRecorder(recorder);
             setAudioChunks([]);
-            recorder.start();
+            recorder.start(onChunk ? timeslice : undefined);
             setIsRecording(true);
         } catch (error) {
             console.error('Error starting recording:', error);
             alert('Could not access microphone. Please ensure you have granted permission.');
         }
-    }, []);
+    }, [onChunk, timeslice]);
 
     const stopRecording = useCallback(async () => {
         if (!mediaRecorder) return null;
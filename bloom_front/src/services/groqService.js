@@ -100,25 +100,6 @@ class GroqService {
         }
     }
 
-    async analyzeWithContext(fileContent, fileType, options = {}) {
-        try {
-            const response = await this.client.post('/ai/analyze-with-context', {
-                content: fileContent,
-                fileType,
-                language: options.language || 'English'
-            });
-
-            if (!response.data || !response.data.response) {
-                throw new Error('Invalid response from AI service');
-            }
-
-            return response.data.response;
-        } catch (error) {
-            console.error('AI Service Error:', error);
-            throw error;
-        }
-    }
-
     async processAudio(formData) {
         try {
             const response = await this.client.post('/ai/process-audio', formData, {
@@ -172,44 +153,48 @@ class GroqService {
                 await this.initFileSession();
             }
 
-            const uploadPromises = files.map(async (file) => {
+            const allowedTypes = [
+                'text/plain',
+                'application/pdf',
+                'application/msword',
+                'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+                'image/jpeg',
+                'image/png',
+                'image/gif',
+                'audio/mpeg',
+                'audio/wav'
+            ];
+            const maxSize = 16 * 1024 * 1024; // 16MB
+
+            const uploadGroup = async (group) => {
                 // Skip if already uploading
-                if (this.pendingUploads.has(file.name)) {
-                    throw new Error(`File ${file.name} is already being uploaded`);
+                const busy = group.find(file => this.pendingUploads.has(file.name));
+                if (busy) {
+                    throw new Error(`File ${busy.name} is already being uploaded`);
                 }
 
                 try {
-                    this.pendingUploads.add(file.name);
+                    group.forEach(file => this.pendingUploads.add(file.name));
 
-                    // Validate file
-                    if (!file) {
-                        throw new Error('Invalid file object');
-                    }
+                    const formData = new FormData();
+                    group.forEach(file => {
+                        // Validate file
+                        if (!file) {
+                            throw new Error('Invalid file object');
+                        }
 
-                    // Validate file size
-                    const maxSize = 16 * 1024 * 1024; // 16MB
-                    if (file.size > maxSize) {
-                        throw new Error(`File ${file.name} exceeds maximum size of 16MB`);
-                    }
+                        // Validate file size
+                        if (file.size > maxSize) {
+                            throw new Error(`File ${file.name} exceeds maximum size of 16MB`);
+                        }
 
-                    // Validate file type
-                    const allowedTypes = [
-                        'text/plain',
-                        'application/pdf',
-                        'application/msword',
-                        'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-                        'image/jpeg',
-                        'image/png',
-                        'image/gif',
-                        'audio/mpeg',
-                        'audio/wav'
-                    ];
-                    if (!allowedTypes.includes(file.type)) {
-                        throw new Error(`File type ${file.type} not supported for ${file.name}`);
-                    }
+                        // Validate file type
+                        if (!allowedTypes.includes(file.type)) {
+                            throw new Error(`File type ${file.type} not supported for ${file.name}`);
+                        }
 
-                    const formData = new FormData();
-                    formData.append('file', file);
+                        formData.append('file', file);
+                    });
 
                     if (additionalContext?.trim()) {
                         formData.append('context', additionalContext.trim());
@@ -225,7 +210,7 @@ class GroqService {
                             // Progress tracking
                             onUploadProgress: (progressEvent) => {
                                 const percentCompleted = Math.round((progressEvent.loaded * 100) / progressEvent.total);
-                                console.log(`Upload progress for ${file.name}: ${percentCompleted}%`);
+                                console.log(`Upload progress for ${group.map(file => file.name).join(', ')}: ${percentCompleted}%`);
                             }
                         }
                     );
@@ -234,16 +219,37 @@ class GroqService {
                         throw new Error(response.data.error);
                     }
 
-                    return {
-                        ...response.data,
+                    // Batched uploads return one entry per file
+                    const fileResults = response.data.files || [response.data];
+                    return fileResults.map(result => ({
+                        ...result,
                         context: additionalContext?.trim() || null
-                    };
+                    }));
                 } finally {
-                    this.pendingUploads.delete(file.name);
+                    group.forEach(file => this.pendingUploads.delete(file.name));
                 }
+            };
+
+            // Images go up together so the server can analyze them in one vision request,
+            // split only where a request would exceed the server's upload limit
+            const images = files.filter(file => file?.type?.startsWith('image/'));
+            const imageGroups = [];
+            let groupSize = 0;
+            images.forEach(file => {
+                if (imageGroups.length === 0 || groupSize + file.size > maxSize) {
+                    imageGroups.push([]);
+                    groupSize = 0;
+                }
+                imageGroups[imageGroups.length - 1].push(file);
+                groupSize += file.size;
             });
+            const groups = [
+                ...imageGroups,
+                ...files.filter(file => !images.includes(file)).map(file => [file])
+            ];
+            const uploadPromises = groups.map(uploadGroup);
 
-            const results = await Promise.all(uploadPromises);
+            const results = (await Promise.all(uploadPromises)).flat();
 
             // Group successful uploads and errors
             const errors = results.filter(result => result.error);
@@ -271,6 +277,53 @@ class GroqService {
         }
     }
 
+    async startTranscriptionStream(language = 'en', onTranscript = () => {}) {
+        // Live server-side transcription: post recorder chunks as they arrive and
+        // receive partial transcripts over Server-Sent Events
+        const { data } = await this.client.post('/ai/process-audio/stream', { language });
+        const streamUrl = `/ai/process-audio/stream/${data.stream_id}`;
+        const binaryHeaders = { headers: { 'Content-Type': 'application/octet-stream' } };
+
+        const events = fetch(`${this.client.defaults.baseURL}${streamUrl}/events`, {
+            headers: { Authorization: `Bearer ${localStorage.getItem('bloom_token')}` }
+        }).then(async (response) => {
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let text = '';
+            for (;;) {
+                const { value, done } = await reader.read();
+                if (done) return text;
+                buffer += decoder.decode(value, { stream: true });
+                const messages = buffer.split('\n\n');
+                buffer = messages.pop();
+                for (const message of messages) {
+                    const dataLine = message.split('\n').find(line => line.startsWith('data: '));
+                    if (!dataLine) continue;
+                    const event = JSON.parse(dataLine.slice(6));
+                    if (event.error) throw new Error(event.error);
+                    text = event.text;
+                    onTranscript(text, event.is_final);
+                    if (event.done) return text;
+                }
+            }
+        });
+
+        // Chunks must reach the server in recording order
+        let pending = Promise.resolve();
+        return {
+            sendChunk: (blob) => {
+                pending = pending.then(() => this.client.post(streamUrl, blob, binaryHeaders));
+                return pending;
+            },
+            finish: async (blob = new Blob()) => {
+                pending = pending.then(() => this.client.post(`${streamUrl}?final=1`, blob, binaryHeaders));
+                await pending;
+                return events;
+            }
+        };
+    }
+
     async processAudioTranscription(audioBlob) {
         try {
             // Use WebSpeech API for transcription